@@ -1,12 +1,23 @@
 import jwt
 import bcrypt
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
 from app.core.config import settings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import datetime
+import hashlib
+import threading
+import time
+
+# Ключи разбираются из PEM один раз при импорте, а не при каждой подписи/проверке токена
+PRIVATE_KEY = load_pem_private_key(settings.auth_jwt.private_key_path.read_bytes(), password=None)
+PUBLIC_KEY = load_pem_public_key(settings.auth_jwt.public_key_path.read_bytes())
 
 
 def encode_jwt(
         payload: dict,
-        private_key: str = settings.auth_jwt.private_key_path.read_text(),
+        private_key=PRIVATE_KEY,
         algorithm: str = settings.auth_jwt.algorithm,
         expire_minutes: int = settings.auth_jwt.access_token_expire_minutes,
         expire_timedelta: datetime.timedelta | None = None,
@@ -31,7 +42,7 @@ def encode_jwt(
 
 def decode_jwt(
         token: str | bytes,
-        public_key: str = settings.auth_jwt.public_key_path.read_text(),
+        public_key=PUBLIC_KEY,
         algorithm: str = settings.auth_jwt.algorithm
 ):
     decoded = jwt.decode(
@@ -42,14 +53,103 @@ def decode_jwt(
     return decoded
 
 
+class VerifiedTokenCache:
+    """
+    Ограниченный LRU-кэш уже проверенных токенов по SHA-256 от токена.
+    Запись живёт до exp самого токена, поэтому истёкший токен снова уходит на полную проверку и отклоняется.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._payloads: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token: str | bytes) -> bytes:
+        return hashlib.sha256(token.encode() if isinstance(token, str) else token).digest()
+
+    def get(self, token: str | bytes) -> dict | None:
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._payloads.get(digest)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._payloads[digest]
+                return None
+            self._payloads.move_to_end(digest)
+            return payload
+
+    def put(self, token: str | bytes, payload: dict):
+        expires_at = payload.get("exp")
+        if expires_at is None:
+            return
+        digest = self._digest(token)
+        with self._lock:
+            self._payloads[digest] = (float(expires_at), payload)
+            self._payloads.move_to_end(digest)
+            while len(self._payloads) > self.maxsize:
+                self._payloads.popitem(last=False)
+
+
+verified_tokens = VerifiedTokenCache(maxsize=settings.auth_jwt.verified_token_cache_size)
+
+
+def decode_jwt_cached(token: str | bytes):
+    """Как decode_jwt, но повторная проверка подписи уже проверенного токена берётся из кэша"""
+    payload = verified_tokens.get(token)
+    if payload is None:
+        payload = decode_jwt(token)
+        verified_tokens.put(token, payload)
+    return payload
+
+
 def hash_password(password: str):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=settings.auth_hashing.bcrypt_rounds))
 
 
 def validate_password(password: str, hashed_password: bytes) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
 
 
+def password_needs_rehash(hashed_password: bytes) -> bool:
+    # Хеш bcrypt имеет вид $2b$<стоимость>$<соль и хеш>
+    try:
+        rounds = int(hashed_password.split(b"$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.auth_hashing.bcrypt_rounds
+
+
+class AuthPoolSaturated(Exception):
+    """Очередь задач хеширования паролей переполнена"""
+
+
+# bcrypt отпускает GIL, поэтому отдельный пул потоков снимает хеширование с event loop
+hashing_executor = ThreadPoolExecutor(max_workers=settings.auth_hashing.workers, thread_name_prefix="bcrypt")
+hashing_pending = 0
+
+
+async def run_in_hashing_pool(func, *args):
+    global hashing_pending
+    if hashing_pending >= settings.auth_hashing.max_pending:
+        raise AuthPoolSaturated()
+    hashing_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(hashing_executor, func, *args)
+    finally:
+        hashing_pending -= 1
+
+
+async def hash_password_async(password: str) -> bytes:
+    return await run_in_hashing_pool(hash_password, password)
+
+
+async def validate_password_async(password: str, hashed_password: bytes) -> bool:
+    return await run_in_hashing_pool(validate_password, password, hashed_password)
+
+
 def create_cookie(
         token: str,
         expire_minutes: int = settings.auth_jwt.access_token_expire_minutes,
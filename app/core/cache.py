@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+from app.core.config import settings
+
+
+class _LoadAbandoned(Exception):
+    """Загрузка прервана отменой запроса, который её начал"""
+
+
+class AsyncTTLCache:
+    """
+    Ограниченный по размеру LRU-кэш с TTL для каждой записи.
+    Одновременные промахи по одному ключу ждут одну загрузку, а не запускают свою.
+    Записи можно помечать тегами и сбрасывать все записи с тегом.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any, frozenset]] = OrderedDict()
+        self._tags: dict[str, set[Hashable]] = {}
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          tags: Callable[[Any], Iterable[str]] | Iterable[str] = ()):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value, _ = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self._remove(key)
+
+        self.misses += 1
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                return await self._load(key, loader, tags)
+            try:
+                return await asyncio.shield(inflight)
+            except _LoadAbandoned:
+                # Запрос, который загружал ключ, отменён: загрузку повторяет первый из ожидающих
+                continue
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                    tags: Callable[[Any], Iterable[str]] | Iterable[str]):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            # Отмена загружающего запроса (отключение клиента, таймаут) не должна отменять ожидающих
+            future.set_exception(e if isinstance(e, Exception) else _LoadAbandoned())
+            future.exception()  # помечаем исключение обработанным, если ожидающих нет
+            raise
+
+        # Если ключ сбросили во время загрузки, результат мог устареть - отдаём его, но не сохраняем
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+            self._store(key, value, tags(value) if callable(tags) else tags)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        self._remove(key)
+        self._inflight.pop(key, None)
+
+    def invalidate_tag(self, tag: str):
+        for key in list(self._tags.get(tag, ())):
+            self.invalidate(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _store(self, key: Hashable, value: Any, tags: Iterable[str]):
+        self._remove(key)
+        tags = frozenset(tags)
+        self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+# Кэш чтений рецептов. Он свой в каждом процессе: записи парсеров из отдельного процесса
+# сюда не доходят, их видимость ограничена TTL
+recipe_cache = AsyncTTLCache(maxsize=settings.recipe_cache.maxsize, ttl=settings.recipe_cache.ttl_seconds)
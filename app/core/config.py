@@ -10,20 +10,81 @@ class AuthJWT(BaseModel):
     public_key_path: Path = BASE_DIR / "app" / "certs" / "jwt-public.pem"
     algorithm: str = "RS256"
     access_token_expire_minutes: int = 60
+    verified_token_cache_size: int = 10000  # число проверенных токенов в кэше
+
+
+class AuthHashing(BaseModel):
+    bcrypt_rounds: int = 12  # стоимость bcrypt, при изменении пароли перехешируются при входе
+    workers: int = 2  # потоки, в которых считается bcrypt
+    max_pending: int = 32  # очередь задач хеширования, сверх неё запросы получают 503
+
+
+class RecipeCache(BaseModel):
+    maxsize: int = 2048  # максимальное число записей
+    ttl_seconds: float = 60.0  # время жизни записи
+
+
+class DatabasePool(BaseModel):
+    # Параметры пула соединений, для SQLite не применяются
+    pool_size: int = 10  # постоянных соединений
+    max_overflow: int = 20  # дополнительных соединений сверх pool_size при пиках
+    pool_timeout: float = 30.0  # сколько ждать свободное соединение, секунд
+    pool_recycle: int = 1800  # пересоздавать соединения старше, секунд
+    pool_pre_ping: bool = True  # проверять соединение перед выдачей
+    statement_cache_size: int = 100  # кэш подготовленных запросов asyncpg, 0 для pgbouncer в режиме transaction
+    echo: bool = False  # логировать SQL
+
+
+class RatingPrior(BaseModel):
+    # Байесовская средняя для популярного: к отзывам рецепта добавляются weight отзывов с оценкой mean.
+    # После изменения значений weighted_rating пересчитывается app/utils/repair_ratings.py
+    mean: float = 3.5  # примерно средняя оценка по каталогу
+    weight: float = 10.0  # сколько отзывов нужно, чтобы средняя рецепта перевесила априорную
+
+
+class SimilarRecipes(BaseModel):
+    top_k: int = 10  # похожих рецептов на каждый рецепт
+    index_path: Path = BASE_DIR / "similar_index.npz"  # TF-IDF матрица и словарь для инкрементальных обновлений
+    max_block_elements: int = 16_000_000  # размер плотного блока сходств при перемножении (float32)
+
+
+class Recommendations(BaseModel):
+    neighbours: int = 20  # похожих по оценкам рецептов на каждый рецепт
+    top_n: int = 20  # рекомендаций на пользователя
+    mean_shrinkage: float = 5.0  # сглаживание средней оценки пользователя к общей, в отзывах
+    max_block_elements: int = 16_000_000  # размер плотного блока сходств при перемножении (float32)
+    read_batch: int = 50_000  # строк оценок за одну выборку при загрузке
+
+
+class Compression(BaseModel):
+    minimum_size: int = 1000  # ответы меньше этого размера (байт) не сжимаются
+    brotli_quality: int = 4  # уровень brotli, если установлен brotli-asgi
 
 
 class Settings(BaseSettings):
     # Настройки БД
     DATABASE_URL: str
+    DATABASE_REPLICA_URL: str | None = None  # реплика для чтений, без неё чтения идут в основную БД
+    database_pool: DatabasePool = DatabasePool()
 
     GIGACHAT_API_KEY: str
+    GIGACHAT_CACHE_PATH: Path = BASE_DIR / "gigachat_cache.sqlite3"  # кэш сгенерированных описаний
+    GIGACHAT_CONCURRENCY: int = 4  # одновременных запросов к GigaChat при пакетной генерации
 
     auth_jwt: AuthJWT = AuthJWT()
+    auth_hashing: AuthHashing = AuthHashing()
+
+    recipe_cache: RecipeCache = RecipeCache()
+    rating_prior: RatingPrior = RatingPrior()
+    compression: Compression = Compression()
+    similar_recipes: SimilarRecipes = SimilarRecipes()
+    recommendations: Recommendations = Recommendations()
 
     class Config:
         # Указываем путь к .env файлу явно
         env_file = BASE_DIR / ".env"
         env_file_encoding = 'utf-8'
+        env_nested_delimiter = '__'  # вложенные настройки: database_pool__pool_size=20
         case_sensitive = True
 
 
@@ -0,0 +1,159 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+from starlette.routing import Mount
+
+# Границы корзин гистограммы времени ответа, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+MOUNTED_ROUTE = "<mount>"
+
+
+class RouteMetrics:
+    """Счётчики одного маршрута: запросы по кодам ответа и гистограмма времени"""
+    __slots__ = ("statuses", "buckets", "latency_sum")
+
+    def __init__(self):
+        self.statuses: dict[int, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # последняя корзина - +Inf
+        self.latency_sum = 0.0
+
+
+def route_label(scope) -> str:
+    """Шаблон маршрута запроса; до роутинга и для ненайденных путей - UNMATCHED_ROUTE"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    # Смонтированные приложения (static) маршрут не записывают: метка - путь Mount, а не root_path запроса
+    for mount in getattr(scope.get("app"), "routes", ()):
+        if isinstance(mount, Mount) and mount.app is endpoint:
+            return mount.path
+    return MOUNTED_ROUTE
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """
+    Метрики HTTP-запросов в памяти процесса и выгрузка в текстовом формате Prometheus.
+    Маршрут - шаблон пути ("/api/recipe/{recipe_id}"), поэтому число серий ограничено числом эндпоинтов.
+    """
+
+    def __init__(self):
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        # scope запросов в работе; маршрут становится известен только после роутинга, поэтому
+        # метка считается при выгрузке
+        self.in_flight: dict[int, dict] = {}
+        self._collectors: list[Callable[[], Iterable[tuple]]] = []
+
+    def observe(self, method: str, route: str, status_code: int, latency: float):
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        metrics.statuses[status_code] = metrics.statuses.get(status_code, 0) + 1
+        metrics.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        metrics.latency_sum += latency
+
+    def add_collector(self, collector: Callable[[], Iterable[tuple]]):
+        """
+        Дополнительные метрики, считываемые при выгрузке (кэш, пул соединений).
+        collector возвращает кортежи (имя, тип, описание, метки, значение)
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_in_flight Requests being processed by route",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        in_flight = dict.fromkeys(self.routes, 0)
+        for scope in list(self.in_flight.values()):
+            key = (scope["method"], route_label(scope))
+            in_flight[key] = in_flight.get(key, 0) + 1
+        for (method, route), count in sorted(in_flight.items()):
+            lines.append(f"http_requests_in_flight{format_labels({'method': method, 'route': route})} {count}")
+
+        lines += [
+            "# HELP http_requests_total Requests by route and status code",
+            "# TYPE http_requests_total counter",
+        ]
+        routes = sorted(self.routes.items())
+        for (method, route), metrics in routes:
+            for status_code, count in sorted(metrics.statuses.items()):
+                labels = format_labels({"method": method, "route": route, "status": status_code})
+                lines.append(f"http_requests_total{labels} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Request latency by route",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), metrics in routes:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), metrics.buckets):
+                cumulative += count
+                labels = format_labels({"method": method, "route": route, "le": bound})
+                lines.append(f"http_request_duration_seconds_bucket{labels} {cumulative}")
+            labels = format_labels({"method": method, "route": route})
+            lines.append(f"http_request_duration_seconds_sum{labels} {metrics.latency_sum}")
+            lines.append(f"http_request_duration_seconds_count{labels} {cumulative}")
+
+        described = set()
+        for collector in self._collectors:
+            for name, metric_type, description, labels, value in collector():
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {name} {description}")
+                    lines.append(f"# TYPE {name} {metric_type}")
+                lines.append(f"{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Чистый ASGI middleware: считает время до конца отправки ответа, код ответа и запросы в работе.
+    Шаблон маршрута берётся из scope["route"], который заполняет роутер FastAPI, для Mount - путь монтирования
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request_id = id(scope)
+        registry.in_flight[request_id] = scope
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            latency = time.perf_counter() - start
+            del registry.in_flight[request_id]
+            registry.observe(scope["method"], route_label(scope), status_code, latency)
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,150 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import tempfile
+from pathlib import Path
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+from app.core.config import BASE_DIR
+
+try:
+    # Необязательная зависимость: без неё собираются только .gz
+    import brotli
+except ImportError:
+    brotli = None
+
+# Файлы с хешем в имени не меняются никогда, браузер может не перепроверять их год
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".html", ".json", ".txt", ".map"}
+# Готовые сжатые варианты в порядке предпочтения сервера при равных q
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def write_atomic(path: Path, content: bytes):
+    # Несколько воркеров могут собирать одновременно: файл подменяется целиком
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Кодировки из Accept-Encoding с их q; q, которое не удалось разобрать, считается нулём"""
+    encodings = {}
+    for item in header.split(","):
+        token, *params = (part.strip() for part in item.split(";"))
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[token.lower()] = q
+    return encodings
+
+
+def preferred_encodings(header: str) -> list[tuple[str, str]]:
+    """Готовые варианты, которые принимает клиент, по убыванию q"""
+    encodings = parse_accept_encoding(header)
+    accepted = [(encodings.get(encoding, encodings.get("*", 0.0)), encoding, suffix)
+                for encoding, suffix in PRECOMPRESSED]
+    accepted.sort(key=lambda item: -item[0])
+    return [(encoding, suffix) for q, encoding, suffix in accepted if q > 0]
+
+
+class StaticAssets:
+    """
+    Сборка статики: копии файлов с хешем содержимого в имени (styles.3f2a9c1b7d4e.css)
+    и заранее сжатые варианты .gz/.br рядом с ними
+    """
+
+    def __init__(self, source_dir: Path, build_dir: Path):
+        self.source_dir = source_dir
+        self.build_dir = build_dir
+        self.manifest: dict[str, str] = {}  # исходное имя -> имя с хешем
+        self.hashed_names: set[str] = set()
+
+    def build(self):
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        for source in sorted(self.source_dir.rglob("*")):
+            if not source.is_file():
+                continue
+            name = source.relative_to(self.source_dir).as_posix()
+            content = source.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            hashed_name = f"{name[:-len(source.suffix)] if source.suffix else name}.{digest}{source.suffix}"
+
+            target = self.build_dir / hashed_name
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(target, content)
+                if source.suffix in COMPRESSIBLE_SUFFIXES:
+                    write_atomic(target.with_name(target.name + ".gz"), gzip.compress(content, 9, mtime=0))
+                    if brotli is not None:
+                        write_atomic(target.with_name(target.name + ".br"), brotli.compress(content))
+            self.manifest[name] = hashed_name
+        self.hashed_names = set(self.manifest.values())
+        return self.manifest
+
+    def url(self, name: str) -> str:
+        """URL файла для шаблонов; файл, которого нет в сборке, отдаётся по исходному имени"""
+        return f"/static/{self.manifest.get(name, name)}"
+
+    def is_hashed(self, path: str) -> bool:
+        return path in self.hashed_names
+
+
+class HashedStaticFiles(StaticFiles):
+    """
+    Отдаёт собранную статику: файлы с хешем - с Cache-Control immutable и, если клиент принимает,
+    готовым .br/.gz вместо сжатия на лету. Исходные имена по-прежнему доступны из source_dir
+    """
+
+    def __init__(self, assets: StaticAssets, **kwargs):
+        self.assets = assets
+        super().__init__(directory=assets.build_dir, **kwargs)
+
+    def get_directories(self, directory=None, packages=None):
+        return [self.assets.build_dir, self.assets.source_dir]
+
+    async def get_response(self, path: str, scope):
+        hashed = self.assets.is_hashed(path.replace(os.sep, "/"))
+        if hashed and scope["method"] in ("GET", "HEAD"):
+            request_headers = Headers(scope=scope)
+            for encoding, suffix in preferred_encodings(request_headers.get("accept-encoding", "")):
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result is not None:
+                    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                    response = FileResponse(full_path, stat_result=stat_result, media_type=media_type, headers={
+                        "Content-Encoding": encoding,
+                        "Vary": "Accept-Encoding",
+                        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+                    })
+                    if self.is_not_modified(response.headers, request_headers):
+                        return NotModifiedResponse(response.headers)
+                    return response
+
+        response = await super().get_response(path, scope)
+        if hashed and response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+# Сборка лежит вне исходников и не хранится в git; собирается при старте приложения
+# или заранее при деплое: python -m app.core.static
+static_assets = StaticAssets(BASE_DIR / "app" / "static", BASE_DIR / "static_build")
+
+
+if __name__ == "__main__":
+    for name, hashed_name in static_assets.build().items():
+        print(f"{name} -> {hashed_name}")
@@ -1,17 +1,150 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.database.models import User, Recipe, Review
-from sqlalchemy import and_
-from sqlalchemy import delete
-from sqlalchemy.orm import selectinload
+from app.database.models import (
+    User, Recipe, Review, Ingredient, RecipeIngredient, CatalogVersion, RecipeSimilar, RecipeNeighbour,
+    UserRecommendation,
+)
+from app.database.search import apply_search
+from sqlalchemy import and_, or_, func, tuple_, case
+from sqlalchemy import delete, insert, update, text
+from sqlalchemy.orm import undefer
+from sqlalchemy.dialects import postgresql, sqlite
 from app.auth import utils as auth_utils
+from app.core.cache import recipe_cache
+from app.core.config import settings
+from app.schemas import RecipeBase, RecipeSummary
+from app.utils.ingredients import normalize_ingredients
+import base64
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(values: list) -> str:
+    """Упаковывает значения ключа последней строки страницы в непрозрачный курсор"""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Распаковывает курсор, при некорректном значении бросает ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+# Ключи сортировки списка рецептов: колонка и направление (True - по убыванию).
+# Для каждого ключа в models.py объявлен индекс (колонка, id), по которому идёт keyset-пагинация
+RECIPE_SORT_KEYS = {
+    "id": (Recipe.id, False),
+    "cooking_time": (Recipe.cooking_time, False),
+    "rating": (Recipe.average_rating, True),
+    "popularity": (Recipe.ratings_count, True),
+}
+
+
+# Колонки списков рецептов: те же поля и в том же порядке, что в RecipeSummary.
+# Списки читаются строками без ORM-объектов и кодируются в JSON без построчной валидации
+RECIPE_SUMMARY_COLUMNS = tuple(getattr(Recipe, name) for name in RecipeSummary.model_fields)
+
+
+def bayesian_rating(ratings_sum, ratings_count):
+    """
+    Средняя с априорными отзывами из settings.rating_prior: рецепт с одним отзывом на 5
+    не обгоняет рецепт с сотнями отзывов со средней 4.9
+    """
+    prior = settings.rating_prior
+    return (prior.weight * prior.mean + ratings_sum) / (prior.weight + ratings_count)
+
+
+def recipe_sort_value(recipe: Recipe, sort: str):
+    column, _ = RECIPE_SORT_KEYS[sort]
+    return getattr(recipe, column.key)
+
+
+def apply_recipe_sort(query, sort: str, cursor: str = None):
+    """Добавляет к запросу ORDER BY по ключу сортировки и условие keyset-пагинации по курсору"""
+    column, descending = RECIPE_SORT_KEYS[sort]
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise ValueError("Invalid cursor")
+        value, last_id = values
+        if not isinstance(last_id, int) or not (value is None or isinstance(value, (int, float))):
+            raise ValueError("Invalid cursor")
+        if sort == "id":
+            query = query.where(Recipe.id < last_id if descending else Recipe.id > last_id)
+        elif value is None:
+            # NULL-значения идут в конце выдачи, внутри них порядок по id
+            query = query.where(column.is_(None), Recipe.id < last_id if descending else Recipe.id > last_id)
+        else:
+            key = tuple_(column, Recipe.id)
+            query = query.where(or_(key < tuple_(value, last_id) if descending else key > tuple_(value, last_id),
+                                    column.is_(None)))
+
+    if sort == "id":
+        order = [Recipe.id.desc() if descending else Recipe.id]
+    elif descending:
+        order = [column.desc().nulls_last(), Recipe.id.desc()]
+    else:
+        order = [column.asc().nulls_last(), Recipe.id]
+    return query.order_by(*order)
+
+
+async def iterate_batches(items, size: int):
+    """Режет обычный или асинхронный итератор на списки по size элементов"""
+    batch = []
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    else:
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def copy_records(ids: list[int], rows: list[dict]) -> tuple[list[str], list[tuple]]:
+    """Колонки и записи для COPY: значения берутся по имени колонки, а не по порядку ключей словаря"""
+    columns = list(rows[0])
+    records = []
+    for recipe_id, row in zip(ids, rows):
+        if row.keys() != rows[0].keys():
+            raise ValueError(f"Recipe row columns differ from the batch: {sorted(row)}")
+        records.append((recipe_id, *(row[column] for column in columns)))
+    return ["id", *columns], records
+
+
+def recipe_content_hash(row: dict, ingredients: list[str]) -> str:
+    """Хеш содержимого рецепта из источника; описание GigaChat производное и в хеш не входит"""
+    content = [row.get(column) for column in ("title", "description", "cuisine", "cooking_time", "image_url")]
+    raw = json.dumps([content, ingredients], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def dialect_insert(db: AsyncSession):
+    """insert с поддержкой ON CONFLICT для текущего диалекта"""
+    return postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
 
 
 class UserCrud:
 
     @staticmethod
     async def create_user(db: AsyncSession, username: str, password: str):
-        hashed_password = auth_utils.hash_password(password)
+        hashed_password = await auth_utils.hash_password_async(password)
 
         new_user = User(username=username, hashed_password=hashed_password)
         db.add(new_user)  # Создаёт нового пользователя и добавляет его в базу данных
@@ -23,9 +156,13 @@ class UserCrud:
     async def authenticate_user(db: AsyncSession, username: str, password: str) -> User | None:
         query = await db.execute(select(User).where(User.username == username))
         user = query.scalars().first()
-        if user and auth_utils.validate_password(password, user.hashed_password):
-            return user
-        return None
+        if not user or not await auth_utils.validate_password_async(password, user.hashed_password):
+            return None
+        if auth_utils.password_needs_rehash(user.hashed_password):
+            # Стоимость bcrypt в настройках изменилась - пересчитываем хеш, пока известен пароль
+            user.hashed_password = await auth_utils.hash_password_async(password)
+            await db.commit()
+        return user
 
     @staticmethod  # Просто находит пользователя по ID
     async def get_user_by_id(db: AsyncSession, user_id: int):
@@ -42,25 +179,245 @@ class RecipeCrud:
 
     @staticmethod
     async def create_recipe(db: AsyncSession, title: str, description: str, cuisine: str, giga_chat_description: str,
-                            cooking_time: int, image_url: str = None):
+                            cooking_time: int, image_url: str = None, ingredients: list[str] = None):
         new_recipe = Recipe(
             title=title,
             description=description,
             cuisine=cuisine,
             average_rating=0.0,
             ratings_count=0,
+            ratings_sum=0,
             giga_chat_description=giga_chat_description,
             cooking_time=cooking_time,
             image_url=image_url
         )
         db.add(new_recipe)
+        if ingredients:
+            await db.flush()
+            await RecipeCrud.set_recipe_ingredients(db, new_recipe, ingredients)
+        await RecipeCrud.bump_catalog_version(db)
         await db.commit()
         await db.refresh(new_recipe)
+
+        # Новый рецепт может попасть на любую страницу списков
+        recipe_cache.invalidate_tag(f"recipe:{new_recipe.id}")
+        recipe_cache.invalidate_tag("recipes")
+        recipe_cache.invalidate_tag("popular")
         return new_recipe
 
+    @staticmethod
+    async def create_recipes_bulk(db: AsyncSession, recipes, batch_size: int = 500, use_copy: bool = False) -> dict:
+        """
+        Массовая вставка рецептов для парсеров. recipes - итератор (в том числе асинхронный) словарей
+        с аргументами create_recipe. Каждая пачка пишется многострочным INSERT ... RETURNING id
+        (или COPY на PostgreSQL при use_copy) и коммитится отдельно. Если пачка упала, её строки
+        вставляются по одной, и ошибочные строки попадают в failed, не прерывая импорт.
+
+        Рецепты с source и source_id вставляются как upsert: существующая строка обновляется только
+        при изменившемся content_hash, неизменённые рецепты пропускаются и считаются в unchanged.
+        """
+        result = {"inserted": [], "unchanged": 0, "failed": []}
+        async for batch in iterate_batches(recipes, batch_size):
+            prepared = {}
+            for index, data in enumerate(batch):
+                row, names = RecipeCrud.prepare_recipe_row(data)
+                # Повтор одного источника в пачке: остаётся последняя версия
+                key = (row["source"], row["source_id"]) if row["source_id"] else index
+                prepared[key] = (row, names)
+            rows, names = zip(*prepared.values())
+            try:
+                ids = await RecipeCrud.insert_recipe_rows(db, list(rows), list(names), use_copy)
+                if ids:
+                    await RecipeCrud.bump_catalog_version(db)
+                await db.commit()
+                result["inserted"].extend(ids)
+                result["unchanged"] += len(rows) - len(ids)
+            except Exception as e:
+                await db.rollback()
+                logger.warning("Bulk insert batch failed, retrying row by row: %s", e)
+                for row, row_names in zip(rows, names):
+                    try:
+                        ids = await RecipeCrud.insert_recipe_rows(db, [row], [row_names], use_copy=False)
+                        if ids:
+                            await RecipeCrud.bump_catalog_version(db)
+                        await db.commit()
+                        result["inserted"].extend(ids)
+                        result["unchanged"] += 1 - len(ids)
+                    except Exception as row_error:
+                        await db.rollback()
+                        result["failed"].append({"title": row.get("title"), "error": str(row_error)})
+
+            recipe_cache.invalidate_tag("recipes")
+            recipe_cache.invalidate_tag("popular")
+        for recipe_id in result["inserted"]:
+            recipe_cache.invalidate_tag(f"recipe:{recipe_id}")
+        return result
+
+    @staticmethod
+    def prepare_recipe_row(data: dict):
+        row = dict(data)
+        names = normalize_ingredients(row.pop("ingredients", None) or [])
+        row.setdefault("image_url", None)
+        row.setdefault("source", None)
+        row.setdefault("source_id", None)
+        if row["source_id"] is not None:
+            row["source_id"] = str(row["source_id"])
+        row.update(average_rating=0.0, ratings_count=0, ratings_sum=0, ingredients_count=len(names))
+        row["content_hash"] = recipe_content_hash(row, names)
+        return row, names
+
+    @staticmethod
+    async def insert_recipe_rows(db: AsyncSession, rows: list[dict], names: list[list[str]], use_copy: bool):
+        # Возвращает id записанных строк; строки-повторы с тем же содержимым пропускаются
+        sourced = [(row, row_names) for row, row_names in zip(rows, names) if row["source_id"]]
+        plain = [(row, row_names) for row, row_names in zip(rows, names) if not row["source_id"]]
+
+        written_ids, written_names = [], []
+        if plain:
+            plain_rows, plain_names = zip(*plain)
+            if use_copy and db.bind.dialect.name == "postgresql":
+                ids = await RecipeCrud.copy_recipe_rows(db, list(plain_rows))
+            else:
+                # executemany с RETURNING SQLAlchemy собирает в многострочные INSERT, id в порядке строк
+                result = await db.execute(insert(Recipe).returning(Recipe.id, sort_by_parameter_order=True),
+                                          list(plain_rows))
+                ids = list(result.scalars())
+            written_ids.extend(ids)
+            written_names.extend(plain_names)
+
+        if sourced:
+            names_by_source = {(row["source"], row["source_id"]): row_names for row, row_names in sourced}
+            result = await db.execute(RecipeCrud.upsert_statement(db), [row for row, _ in sourced])
+            upserted = result.all()
+            if upserted:
+                # У обновлённых рецептов старые связи с ингредиентами заменяются
+                upserted_ids = [recipe_id for recipe_id, _, _ in upserted]
+                await db.execute(delete(RecipeIngredient).where(RecipeIngredient.recipe_id.in_(upserted_ids)))
+            for recipe_id, source, source_id in upserted:
+                written_ids.append(recipe_id)
+                written_names.append(names_by_source[(source, source_id)])
+
+        await RecipeCrud.link_ingredients(db, written_ids, written_names)
+        return written_ids
+
+    @staticmethod
+    def upsert_statement(db: AsyncSession):
+        statement = dialect_insert(db)(Recipe)
+        updated_columns = ("title", "description", "cuisine", "giga_chat_description", "cooking_time", "image_url",
+                           "ingredients_count", "content_hash")
+        return statement.on_conflict_do_update(
+            index_elements=[Recipe.source, Recipe.source_id],
+            set_={**{column: statement.excluded[column] for column in updated_columns},
+                  "version": Recipe.version + 1},
+            where=Recipe.content_hash.is_distinct_from(statement.excluded.content_hash),
+        ).returning(Recipe.id, Recipe.source, Recipe.source_id)
+
+    @staticmethod
+    async def link_ingredients(db: AsyncSession, ids: list[int], names: list[list[str]]):
+        ingredient_ids = await RecipeCrud.get_or_create_ingredients(
+            db, sorted({name for recipe_names in names for name in recipe_names})
+        )
+        links = [
+            {"recipe_id": recipe_id, "ingredient_id": ingredient_ids[name]}
+            for recipe_id, recipe_names in zip(ids, names)
+            for name in recipe_names
+        ]
+        if links:
+            await db.execute(insert(RecipeIngredient), links)
+
+    @staticmethod
+    async def copy_recipe_rows(db: AsyncSession, rows: list[dict]) -> list[int]:
+        # COPY не возвращает id, поэтому они заранее берутся из последовательности таблицы
+        result = await db.execute(
+            text("SELECT nextval(pg_get_serial_sequence('recipes', 'id')) FROM generate_series(1, :n)"),
+            {"n": len(rows)},
+        )
+        ids = list(result.scalars())
+        columns, records = copy_records(ids, rows)
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table("recipes", records=records, columns=columns)
+        return ids
+
+    @staticmethod
+    async def get_or_create_ingredients(db: AsyncSession, names: list[str]) -> dict[str, int]:
+        if not names:
+            return {}
+        query = await db.execute(select(Ingredient.name, Ingredient.id).where(Ingredient.name.in_(names)))
+        ingredient_ids = dict(query.all())
+
+        missing = [Ingredient(name=name) for name in names if name not in ingredient_ids]
+        if missing:
+            db.add_all(missing)
+            await db.flush()
+            ingredient_ids.update((ingredient.name, ingredient.id) for ingredient in missing)
+        return ingredient_ids
+
+    @staticmethod
+    async def set_recipe_ingredients(db: AsyncSession, recipe: Recipe, ingredients: list[str]):
+        # Заменяет ингредиенты рецепта нормализованными названиями, изменения не коммитит
+        names = normalize_ingredients(ingredients)
+        ingredient_ids = await RecipeCrud.get_or_create_ingredients(db, names)
+
+        await db.execute(delete(RecipeIngredient).where(RecipeIngredient.recipe_id == recipe.id))
+        db.add_all(RecipeIngredient(recipe_id=recipe.id, ingredient_id=ingredient_ids[name]) for name in names)
+        recipe.ingredients_count = len(names)
+
+    @staticmethod
+    async def get_recipes_by_ingredients(db: AsyncSession, ingredients: list[str], limit: int = 20):
+        # Пересечение списков рецептов по индексу ingredient_id и подсчёт совпадений одной агрегацией;
+        # покрытие - доля ингредиентов рецепта, которые есть у пользователя
+        names = normalize_ingredients(ingredients)
+        if not names:
+            return []
+
+        ingredient_ids = select(Ingredient.id).where(Ingredient.name.in_(names))
+        matches = (
+            select(RecipeIngredient.recipe_id, func.count().label("matched"))
+            .where(RecipeIngredient.ingredient_id.in_(ingredient_ids))
+            .group_by(RecipeIngredient.recipe_id)
+            .subquery()
+        )
+        coverage = (matches.c.matched / func.nullif(Recipe.ingredients_count, 0)).label("coverage")
+        query = (
+            select(*RECIPE_SUMMARY_COLUMNS, matches.c.matched.label("matched_ingredients"), coverage)
+            .join(matches, matches.c.recipe_id == Recipe.id)
+            .order_by(coverage.desc(), matches.c.matched.desc(), Recipe.id)
+            .limit(limit)
+        )
+        result = await db.execute(query)
+        return result.all()
+
+    @staticmethod
+    async def get_similar_recipes(db: AsyncSession, recipe_id: int, limit: int = 10):
+        # Соседи посчитаны заранее (app/recommendations/similar.py), здесь только чтение по первичному ключу
+        query = await db.execute(
+            select(*RECIPE_SUMMARY_COLUMNS)
+            .join(RecipeSimilar, RecipeSimilar.similar_id == Recipe.id)
+            .where(RecipeSimilar.recipe_id == recipe_id)
+            .order_by(RecipeSimilar.score.desc(), Recipe.id)
+            .limit(limit)
+        )
+        return query.all()
+
+    @staticmethod
+    async def get_recommended_recipes(db: AsyncSession, user_id: int, limit: int = 10):
+        # Списки посчитаны заранее (app/recommendations/collaborative.py), читаются по первичному ключу
+        query = await db.execute(
+            select(*RECIPE_SUMMARY_COLUMNS)
+            .join(UserRecommendation, UserRecommendation.recipe_id == Recipe.id)
+            .where(UserRecommendation.user_id == user_id)
+            .order_by(UserRecommendation.score.desc(), Recipe.id)
+            .limit(limit)
+        )
+        return query.all()
+
     @staticmethod
     async def get_recipe(db: AsyncSession, recipe_id: int):
-        query = await db.execute(select(Recipe).where(Recipe.id == recipe_id).options(selectinload(Recipe.reviews)))
+        query = await db.execute(
+            select(Recipe).where(Recipe.id == recipe_id)
+            .options(undefer(Recipe.description), undefer(Recipe.giga_chat_description))
+        )
         return query.scalars().first()
 
     @staticmethod
@@ -68,58 +425,256 @@ class RecipeCrud:
         query = await db.execute(select(Recipe).where(Recipe.cuisine == cuisine))
         return query.scalars().all()
 
+    @staticmethod
+    async def get_recipe_version(db: AsyncSession, recipe_id: int) -> int | None:
+        query = await db.execute(select(Recipe.version).where(Recipe.id == recipe_id))
+        return query.scalar()
+
+    @staticmethod
+    async def get_catalog_version(db: AsyncSession) -> int:
+        query = await db.execute(select(CatalogVersion.version).where(CatalogVersion.name == "recipes"))
+        return query.scalar() or 0
+
+    @staticmethod
+    async def bump_catalog_version(db: AsyncSession):
+        # Увеличивается в транзакции записи, поэтому после коммита изменений ETag списков гарантированно меняется
+        statement = dialect_insert(db)(CatalogVersion).values(name="recipes", version=1)
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[CatalogVersion.name], set_={"version": CatalogVersion.version + 1}
+        ))
+
+    @staticmethod
+    async def recipe_exists(db: AsyncSession, recipe_id: int) -> bool:
+        query = await db.execute(select(Recipe.id).where(Recipe.id == recipe_id))
+        return query.scalar() is not None
+
     @staticmethod
     async def add_review(db: AsyncSession, recipe_id: int, user_id: int, rating: int, text: str):
         new_review = Review(recipe_id=recipe_id, user_id=user_id, rating=rating, text=text)
         db.add(new_review)
+        await db.flush()
+
+        # Инкрементальный пересчёт одним атомарным UPDATE в той же транзакции, что и вставка отзыва:
+        # выражения SET читают текущие значения строки, поэтому параллельные отзывы не затирают друг друга
+        result = await db.execute(
+            update(Recipe)
+            .where(Recipe.id == recipe_id)
+            .values(
+                ratings_sum=Recipe.ratings_sum + rating,
+                ratings_count=Recipe.ratings_count + 1,
+                average_rating=(Recipe.ratings_sum + rating) / (Recipe.ratings_count + 1),
+                weighted_rating=bayesian_rating(Recipe.ratings_sum + rating, Recipe.ratings_count + 1),
+                version=Recipe.version + 1,
+            )
+            .returning(Recipe.average_rating, Recipe.ratings_count)
+        )
+        if result.first() is None:
+            await db.rollback()
+            return None
+        await RecipeCrud.bump_catalog_version(db)
         await db.commit()
-        await db.refresh(new_review)
 
-        # Пересчёт средней оценки и количества отзывов
-        result = await db.execute(select(Review.rating).where(Review.recipe_id == recipe_id))
-        ratings = result.scalars().all()
+        # Сбрасываются записи, содержащие рецепт, и списки, зависящие от рейтинга
+        recipe_cache.invalidate_tag(f"recipe:{recipe_id}")
+        recipe_cache.invalidate_tag("rating")
+        recipe_cache.invalidate_tag("popular")
+        return new_review
 
-        if ratings:
-            avg = sum(ratings) / len(ratings)
-            count = len(ratings)
+    @staticmethod
+    async def recalculate_ratings(db: AsyncSession):
+        # Разовое восстановление агрегатов по таблице отзывов (для строк, созданных до появления ratings_sum)
+        def aggregate(expression):
+            return select(expression).where(Review.recipe_id == Recipe.id).scalar_subquery()
 
-            query = await db.execute(select(Recipe).where(Recipe.id == recipe_id))
-            recipe = query.scalars().first()
-            if recipe:
-                recipe.average_rating = avg
-                recipe.ratings_count = count
-                await db.commit()
-                await db.refresh(recipe)
+        ratings_sum = aggregate(func.coalesce(func.sum(Review.rating), 0))
+        ratings_count = aggregate(func.count(Review.id))
+        result = await db.execute(
+            update(Recipe).values(
+                ratings_sum=ratings_sum,
+                ratings_count=ratings_count,
+                average_rating=aggregate(func.coalesce(func.avg(Review.rating), 0.0)),
+                weighted_rating=case((ratings_count == 0, 0.0), else_=bayesian_rating(ratings_sum, ratings_count)),
+                version=Recipe.version + 1,
+            )
+        )
+        await RecipeCrud.bump_catalog_version(db)
+        await db.commit()
+        return result.rowcount
 
-        return new_review
+    @staticmethod
+    async def get_reviews_for_recipe(db: AsyncSession, recipe_id: int, cursor: str = None, limit: int = 20):
+        # Новые отзывы первыми; keyset по id внутри recipe_id идёт по индексу ix_reviews_recipe_id_id
+        query = (
+            select(Review.id, Review.rating, Review.text, Review.user_id)
+            .where(Review.recipe_id == recipe_id)
+            .order_by(Review.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 1:
+                raise ValueError("Invalid cursor")
+            last_id, = values
+            if not isinstance(last_id, int):
+                raise ValueError("Invalid cursor")
+            query = query.where(Review.id < last_id)
+
+        result = await db.execute(query)
+        reviews = result.all()
+
+        next_cursor = None
+        if len(reviews) > limit:
+            reviews = reviews[:limit]
+            next_cursor = encode_cursor([reviews[-1].id])
+        return reviews, next_cursor
 
     @staticmethod
-    async def get_reviews_for_recipe(db: AsyncSession, recipe_id: int):
-        query = await db.execute(select(Review).where(Review.recipe_id == recipe_id).options(selectinload(Review.user)))
-        return query.scalars().all()
+    async def get_rating_histogram(db: AsyncSession, recipe_id: int) -> dict[int, int]:
+        query = await db.execute(
+            select(Review.rating, func.count()).where(Review.recipe_id == recipe_id).group_by(Review.rating)
+        )
+        histogram = dict.fromkeys(range(1, 6), 0)
+        histogram.update(query.all())
+        return histogram
 
     @staticmethod
-    async def get_recipes_by_filters(db: AsyncSession, cuisine: str = None, max_cooking_time: int = None):
-        query = select(Recipe)
+    def build_recipes_query(cuisines: list[str] = None, min_cooking_time: int = None, max_cooking_time: int = None,
+                            min_rating: float = None, min_ratings_count: int = None):
+        query = select(*RECIPE_SUMMARY_COLUMNS)
         filters = []
 
-        if cuisine:
-            filters.append(Recipe.cuisine == cuisine)
+        if cuisines:
+            filters.append(Recipe.cuisine.in_(cuisines) if len(cuisines) > 1 else Recipe.cuisine == cuisines[0])
+        if min_cooking_time is not None:
+            filters.append(Recipe.cooking_time >= min_cooking_time)
         if max_cooking_time is not None:
             filters.append(Recipe.cooking_time <= max_cooking_time)
+        if min_rating is not None:
+            filters.append(Recipe.average_rating >= min_rating)
+        if min_ratings_count is not None:
+            filters.append(Recipe.ratings_count >= min_ratings_count)
 
         if filters:
             query = query.where(and_(*filters))
+        return query
+
+    @staticmethod
+    async def get_recipes_by_filters(db: AsyncSession, sort: str = "id", cursor: str = None, limit: int = 50,
+                                     **filters):
+        # Keyset-пагинация по (ключ сортировки, id): следующая страница начинается после последней строки
+        # из курсора, поэтому стоимость запроса не растёт с номером страницы
+        query = RecipeCrud.build_recipes_query(**filters)
+        query = apply_recipe_sort(query, sort, cursor).limit(limit + 1)
 
         result = await db.execute(query)
-        return result.scalars().all()
+        recipes = result.all()
+
+        next_cursor = None
+        if len(recipes) > limit:
+            recipes = recipes[:limit]
+            last = recipes[-1]
+            next_cursor = encode_cursor([recipe_sort_value(last, sort), last.id])
+        return recipes, next_cursor
 
     @staticmethod
-    async def get_popular_recipes(db: AsyncSession, limit: int = 10):
-        query = await db.execute(select(Recipe).order_by(Recipe.average_rating.desc()).limit(limit))
-        return query.scalars().all()
+    async def stream_recipes_by_filters(db: AsyncSession, sort: str = "id", **filters):
+        # Построчная выдача через серверный курсор: в памяти держится только текущая пачка строк
+        query = apply_recipe_sort(RecipeCrud.build_recipes_query(**filters), sort)
+        result = await db.stream(query.execution_options(yield_per=500))
+        async for recipe in result:
+            yield recipe
+
+    @staticmethod
+    async def search_recipes(db: AsyncSession, q: str, cursor: str = None, limit: int = 20, **filters):
+        # Выдача упорядочена по релевантности, поэтому курсор хранит смещение следующей страницы
+        offset = 0
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 1:
+                raise ValueError("Invalid cursor")
+            offset, = values
+            if not isinstance(offset, int) or offset < 0:
+                raise ValueError("Invalid cursor")
+
+        query = apply_search(RecipeCrud.build_recipes_query(**filters), db.bind.dialect.name, q)
+        result = await db.execute(query.offset(offset).limit(limit + 1))
+        recipes = result.all()
+
+        next_cursor = None
+        if len(recipes) > limit:
+            recipes = recipes[:limit]
+            next_cursor = encode_cursor([offset + limit])
+        return recipes, next_cursor
+
+    @staticmethod
+    async def get_popular_recipes(db: AsyncSession, limit: int = 10, cuisine: str = None):
+        # Первые limit строк индекса ix_recipes_weighted_rating (или ix_recipes_cuisine_weighted_rating) с конца
+        query = select(*RECIPE_SUMMARY_COLUMNS)
+        if cuisine:
+            query = query.where(Recipe.cuisine == cuisine)
+        query = await db.execute(query.order_by(Recipe.weighted_rating.desc(), Recipe.id.desc()).limit(limit))
+        return query.all()
 
     @staticmethod
     async def clear_recipes_table(db: AsyncSession):
+        await db.execute(delete(RecipeSimilar))
+        await db.execute(delete(RecipeNeighbour))
+        await db.execute(delete(UserRecommendation))
+        await db.execute(delete(RecipeIngredient))
         await db.execute(delete(Recipe))
+        await RecipeCrud.bump_catalog_version(db)
         await db.commit()
+        # Сохранённый индекс сходства описывает удалённые рецепты, следующий импорт пересоберёт его
+        settings.similar_recipes.index_path.unlink(missing_ok=True)
+
+
+def recipe_rows_to_dicts(rows) -> list[dict]:
+    return [dict(row._mapping) for row in rows]
+
+
+class CachedRecipeCrud:
+    """
+    Чтения RecipeCrud через recipe_cache; результаты хранятся отвязанными от сессии:
+    рецепт - схемой, списки - словарями в порядке полей RecipeSummary
+    """
+
+    # version - версия рецепта или каталога, с которой сверяется ETag. Она входит в ключ,
+    # поэтому изменения из других процессов (парсеров) не отдаются из кэша под новым ETag
+
+    @staticmethod
+    async def get_recipe(db: AsyncSession, recipe_id: int, version: int = None):
+        async def load():
+            recipe = await RecipeCrud.get_recipe(db, recipe_id)
+            return RecipeBase.model_validate(recipe) if recipe else None
+
+        return await recipe_cache.get_or_load(("recipe", recipe_id, version), load, tags=[f"recipe:{recipe_id}"])
+
+    @staticmethod
+    async def get_popular_recipes(db: AsyncSession, limit: int = 10, version: int = None, cuisine: str = None):
+        async def load():
+            return recipe_rows_to_dicts(await RecipeCrud.get_popular_recipes(db, limit=limit, cuisine=cuisine))
+
+        return await recipe_cache.get_or_load(("popular", limit, version, cuisine), load, tags=["popular"])
+
+    @staticmethod
+    async def get_recipes_by_filters(db: AsyncSession, sort: str = "id", cursor: str = None, limit: int = 50,
+                                     version: int = None, **filters):
+        async def load():
+            recipes, next_cursor = await RecipeCrud.get_recipes_by_filters(db, sort=sort, cursor=cursor, limit=limit,
+                                                                           **filters)
+            return recipe_rows_to_dicts(recipes), next_cursor
+
+        def tags(page):
+            recipes, _ = page
+            page_tags = {"recipes"}
+            page_tags.update(f"recipe:{recipe['id']}" for recipe in recipes)
+            # Отзыв меняет рейтинг и может сдвинуть рецепт в такие списки или из них
+            if sort in ("rating", "popularity") or filters.get("min_rating") is not None \
+                    or filters.get("min_ratings_count") is not None:
+                page_tags.add("rating")
+            return page_tags
+
+        key = ("recipes", version, sort, cursor, limit, tuple(sorted(
+            (name, tuple(value) if isinstance(value, list) else value) for name, value in filters.items()
+        )))
+        return await recipe_cache.get_or_load(key, load, tags=tags)
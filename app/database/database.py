@@ -1,9 +1,117 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+
+class PoolStats:
+    """Время ожидания свободного соединения в пуле: отличает медленную БД от нехватки соединений"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_avg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+                "wait_seconds_max": self.wait_seconds_max,
+            }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет ожидание соединения при каждой выдаче"""
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        # Свой публичный атрибут вместо приватного _max_overflow пула, который может смениться между версиями
+        self.max_overflow = max_overflow
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # Пул пересоздаётся при dispose, счётчики переносятся в новый
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+def create_engine(url: str):
+    pool = settings.database_pool
+    options = {"echo": pool.echo}
+    url = make_url(url)
+    # У SQLite свой пул без очереди соединений, параметры пула к нему не применяются
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=pool.pool_size,
+            max_overflow=pool.max_overflow,
+            pool_timeout=pool.pool_timeout,
+            pool_recycle=pool.pool_recycle,
+            pool_pre_ping=pool.pool_pre_ping,
+        )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "statement_cache_size": pool.statement_cache_size,
+            "prepared_statement_cache_size": pool.statement_cache_size,
+        }
+    return create_async_engine(url, **options)
+
+
+def pool_status(engine) -> dict:
+    """Заполненность пула и статистика ожидания соединений"""
+    pool = engine.sync_engine.pool
+    status = {"pool": type(pool).__name__}
+    # Пулы с очередью создаёт только create_engine, и это всегда InstrumentedQueuePool
+    if isinstance(pool, InstrumentedQueuePool):
+        capacity = pool.size() + pool.max_overflow
+        status.update(
+            size=pool.size(),
+            max_overflow=pool.max_overflow,
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=pool.overflow(),
+            saturation=pool.checkedout() / capacity if capacity > 0 else 0.0,
+        )
+        status.update(pool.stats.snapshot())
+    return status
+
+
+engine = create_engine(settings.DATABASE_URL)
 async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+# Чтения GET-эндпоинтов идут в реплику, если она задана, иначе в основную БД
+read_engine = create_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else engine
+read_session = sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -11,3 +119,10 @@ Base = declarative_base()
 async def get_db():
     async with async_session() as session:
         yield session
+
+
+# Dependency только для чтения: сессия к реплике. Реплика может отставать, поэтому то, что читается
+# для последующей записи, должно идти через get_db
+async def get_read_db():
+    async with read_session() as session:
+        yield session
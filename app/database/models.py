@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, JSON, LargeBinary
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, JSON, LargeBinary, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, deferred
 from .database import Base
 
 
@@ -18,25 +18,117 @@ class Recipe(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)  # название
-    description = Column(String, nullable=True)  # полное описание
+    # Большие текстовые колонки не загружаются вместе с рецептом, их подгружает только get_recipe (undefer)
+    description = deferred(Column(String, nullable=True))  # полное описание
     cuisine = Column(String, nullable=True)  # вид кухни
-    average_rating = Column(Float, default=0.0)  # средняя оценка
-    ratings_count = Column(Integer, default=0)  # количество оценок
-    giga_chat_description = Column(String, nullable=True)  # краткое описание с giga chat
+    average_rating = Column(Float, default=0.0, nullable=False, server_default="0")  # средняя оценка
+    ratings_count = Column(Integer, default=0, nullable=False, server_default="0")  # количество оценок
+    ratings_sum = Column(Integer, default=0, nullable=False, server_default="0")  # сумма оценок для пересчёта средней
+    weighted_rating = Column(Float, default=0.0, nullable=False, server_default="0")  # байесовская средняя, 0 без отзывов
+    giga_chat_description = deferred(Column(String, nullable=True))  # краткое описание с giga chat
     cooking_time = Column(Integer, nullable=True)  # время готовки в минутах
     image_url = Column(String, nullable=True) # изображение
+    ingredients_count = Column(Integer, default=0, nullable=False, server_default="0")  # число ингредиентов
+    source = Column(String, nullable=True)  # откуда рецепт: themealdb, allrecipes
+    source_id = Column(String, nullable=True)  # idMeal или URL страницы в источнике
+    content_hash = Column(String(64), nullable=True)  # хеш содержимого для повторного парсинга
+    version = Column(Integer, default=1, nullable=False, server_default="1")  # растёт при каждом изменении (ETag)
 
     reviews = relationship("Review", back_populates="recipe")
 
+    # Индексы под фильтры и ключи сортировки RecipeCrud.get_recipes_by_filters:
+    # id в конце каждого индекса нужен для keyset-пагинации без дополнительной сортировки
+    __table_args__ = (
+        UniqueConstraint("source", "source_id", name="uq_recipes_source"),
+        Index("ix_recipes_cuisine_id", "cuisine", "id"),
+        Index("ix_recipes_cuisine_cooking_time", "cuisine", "cooking_time", "id"),
+        Index("ix_recipes_cuisine_average_rating", "cuisine", "average_rating", "id"),
+        Index("ix_recipes_cuisine_ratings_count", "cuisine", "ratings_count", "id"),
+        Index("ix_recipes_cooking_time", "cooking_time", "id"),
+        Index("ix_recipes_average_rating", "average_rating", "id"),
+        Index("ix_recipes_ratings_count", "ratings_count", "id"),
+        # Популярное (в том числе по кухне) читается обратным проходом по индексу
+        Index("ix_recipes_weighted_rating", "weighted_rating", "id"),
+        Index("ix_recipes_cuisine_weighted_rating", "cuisine", "weighted_rating", "id"),
+    )
+
 
 class Review(Base):
     __tablename__ = "reviews"
 
     id = Column(Integer, primary_key=True, index=True)
     recipe_id = Column(Integer, ForeignKey("recipes.id"))
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     rating = Column(Integer, nullable=False)
     text = Column(String, nullable=True)
 
     user = relationship("User", back_populates="reviews")
     recipe = relationship("Recipe", back_populates="reviews")
+
+    # Отзывы рецепта читаются страницами от новых к старым: индекс (recipe_id, id) отдаёт их
+    # без сортировки и заменяет отдельный индекс по recipe_id
+    __table_args__ = (
+        Index("ix_reviews_recipe_id_id", "recipe_id", "id"),
+    )
+
+
+class Ingredient(Base):
+    __tablename__ = "ingredients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False, index=True)  # нормализованное название
+
+
+class RecipeIngredient(Base):
+    __tablename__ = "recipe_ingredients"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id"), primary_key=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), primary_key=True)
+
+    # Инвертированный индекс: список рецептов для каждого ингредиента
+    __table_args__ = (
+        Index("ix_recipe_ingredients_ingredient_id", "ingredient_id", "recipe_id"),
+    )
+
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+
+    # Счётчик изменений таблицы рецептов, увеличивается в транзакции каждой записи (ETag списков)
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class RecipeSimilar(Base):
+    __tablename__ = "recipe_similar"
+
+    # Заранее посчитанные ближайшие рецепты по TF-IDF (app/recommendations/similar.py)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    similar_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+
+
+class RecipeNeighbour(Base):
+    __tablename__ = "recipe_neighbours"
+
+    # Ближайшие рецепты по оценкам пользователей (app/recommendations/collaborative.py)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    neighbour_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+
+
+class UserRecommendation(Base):
+    __tablename__ = "user_recommendations"
+
+    # Заранее посчитанные рекомендации, эндпоинт только читает их по user_id
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+
+
+class Watermark(Base):
+    __tablename__ = "watermarks"
+
+    # Последний обработанный id для инкрементальных фоновых пересчётов
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False)
@@ -0,0 +1,102 @@
+import re
+from sqlalchemy import event, false, func, literal_column, table, column, text
+from app.database.models import Base, Recipe
+
+# Веса полей при ранжировании: название важнее краткого описания GigaChat, оно важнее полного текста
+TITLE_WEIGHT, GIGA_CHAT_WEIGHT, DESCRIPTION_WEIGHT = 10.0, 5.0, 1.0
+
+POSTGRES_DDL = [
+    """
+    ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(giga_chat_description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_vector ON recipes USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE recipes_fts USING fts5(
+        title, giga_chat_description, description,
+        content='recipes', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER recipes_fts_ai AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, title, giga_chat_description, description)
+        VALUES (new.id, new.title, new.giga_chat_description, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_fts_ad AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, giga_chat_description, description)
+        VALUES ('delete', old.id, old.title, old.giga_chat_description, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_fts_au AFTER UPDATE OF title, giga_chat_description, description ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, giga_chat_description, description)
+        VALUES ('delete', old.id, old.title, old.giga_chat_description, old.description);
+        INSERT INTO recipes_fts(rowid, title, giga_chat_description, description)
+        VALUES (new.id, new.title, new.giga_chat_description, new.description);
+    END
+    """,
+    # Индексирует строки, которые уже были в таблице до создания полнотекстового индекса
+    "INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')",
+]
+
+recipes_fts = table("recipes_fts", column("rowid"))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    """Создаёт полнотекстовый индекс рецептов: tsvector + GIN на PostgreSQL, FTS5 на SQLite"""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.execute(text(statement))
+    elif dialect == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipes_fts'")
+        ).first()
+        if not exists:
+            for statement in SQLITE_DDL:
+                connection.execute(text(statement))
+
+
+@event.listens_for(Base.metadata, "after_drop")
+def drop_search_index(target, connection, **kw):
+    # Триггеры FTS5 удаляются вместе с recipes, а сама виртуальная таблица осталась бы со старым индексом
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS recipes_fts"))
+
+
+def make_fts5_query(q: str) -> str:
+    # Каждое слово берётся в кавычки, чтобы пользовательский ввод не разбирался как синтаксис FTS5
+    words = re.findall(r"\w+", q.lower())
+    return " ".join(f'"{word}"' for word in words)
+
+
+def apply_search(query, dialect: str, q: str):
+    """Добавляет к запросу рецептов условие полнотекстового поиска и сортировку по релевантности"""
+    if dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery("english", q)
+        vector = literal_column("recipes.search_vector")
+        rank = func.ts_rank_cd(vector, tsquery)
+        return query.where(vector.op("@@")(tsquery)).order_by(rank.desc(), Recipe.id)
+
+    if dialect == "sqlite":
+        fts_query = make_fts5_query(q)
+        if not fts_query:
+            return query.where(false())
+        fts = literal_column("recipes_fts")
+        rank = func.bm25(fts, TITLE_WEIGHT, GIGA_CHAT_WEIGHT, DESCRIPTION_WEIGHT)
+        return (
+            query.join(recipes_fts, recipes_fts.c.rowid == Recipe.id)
+            .where(fts.op("MATCH")(fts_query))
+            .order_by(rank, Recipe.id)
+        )
+
+    raise NotImplementedError(f"Full-text search is not supported for {dialect}")
@@ -0,0 +1,61 @@
+import asyncio
+from sqlalchemy import Index, UniqueConstraint, inspect, insert, select, text
+from sqlalchemy.schema import CreateColumn
+from app.database import search  # noqa: F401 - DDL полнотекстового поиска выполняется вместе с create_all
+from app.database.database import engine
+from app.database.models import Base, CatalogVersion
+
+
+def add_missing_columns(connection, table):
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    # На PostgreSQL несколько воркеров могут обновлять схему одновременно
+    if_not_exists = "IF NOT EXISTS " if connection.dialect.name == "postgresql" else ""
+    for column in table.columns:
+        if column.name not in existing:
+            definition = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {if_not_exists}{definition}"))
+
+
+def add_missing_unique_constraints(connection, table):
+    """
+    UniqueConstraint создаётся только вместе с таблицей, а SQLite не умеет добавлять его через
+    ALTER TABLE. Уникальный индекс с тем же именем так же служит целью ON CONFLICT
+    """
+    inspector = inspect(connection)
+    existing = {index["name"] for index in inspector.get_indexes(table.name)}
+    existing |= {constraint["name"] for constraint in inspector.get_unique_constraints(table.name)}
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.name and constraint.name not in existing:
+            Index(constraint.name, *constraint.columns, unique=True).create(connection)
+
+
+def seed_catalog_versions(connection):
+    # Строка счётчика для ETag списков; bump_catalog_version создаёт её и сам, но чтение до первой записи
+    # должно видеть версию 0, а не пустую таблицу
+    exists = connection.execute(select(CatalogVersion.name).where(CatalogVersion.name == "recipes")).first()
+    if exists is None:
+        connection.execute(insert(CatalogVersion).values(name="recipes", version=0))
+
+
+def upgrade_schema(connection):
+    """
+    Приводит базу к моделям. create_all создаёт только недостающие таблицы, поэтому колонки
+    и индексы, появившиеся в уже существующих таблицах, добавляются здесь. Новые колонки
+    таких таблиц должны быть nullable или иметь server_default
+    """
+    Base.metadata.create_all(connection)
+    for table in Base.metadata.sorted_tables:
+        add_missing_columns(connection, table)
+        add_missing_unique_constraints(connection, table)
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    seed_catalog_versions(connection)
+
+
+async def upgrade_database(target_engine=engine):
+    async with target_engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+
+
+if __name__ == "__main__":
+    asyncio.run(upgrade_database())
@@ -1,41 +1,131 @@
 from fastapi import FastAPI, Depends, HTTPException, APIRouter, Request, Query, status, Response, Cookie
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.database import async_session, engine, Base, get_db
-from app.database.crud import UserCrud, RecipeCrud
-from app.schemas import RecipeBase, ReviewBase, ReviewResponse, UserCreate, UserResponse
+from app.database.database import engine, read_engine, read_session, get_db, get_read_db, pool_status
+from app.database.crud import UserCrud, RecipeCrud, CachedRecipeCrud, recipe_rows_to_dicts
+from app.database.upgrade import upgrade_database
+from app.core.cache import recipe_cache
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, metrics
+from app.core.static import HashedStaticFiles, static_assets
+from app.schemas import RecipeBase, RecipeSummary, RecipeMatch, RecipePage, ReviewBase, ReviewPage, ReviewResponse, UserCreate, UserResponse
 
 from app.auth import utils as auth_utils
 import jwt
+import orjson
 
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List
+from typing import List, Literal
 import uvicorn
 
+try:
+    # Необязательная зависимость: brotli для клиентов, которые его принимают, и gzip для остальных
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
 BASE_DIR = Path(__file__).parent.parent
 
+RECIPES_PAGE_SIZE = 50  # как limit по умолчанию в /api/recipes/filter/, которым скрипт грузит следующие страницы
+POPULAR_STRIP_SIZE = 5
+SIMILAR_STRIP_SIZE = 5
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await upgrade_database(engine)
+    # Шаблоны компилируются заранее, чтобы первый запрос в каждом воркере не ждал загрузки
+    for name in templates.env.list_templates():
+        templates.env.get_template(name)
     yield
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
 
 
 router = APIRouter()
 app = FastAPI(lifespan=lifespan)
 templates = Jinja2Templates(directory=BASE_DIR / "app" / "templates")
-app.mount("/static", StaticFiles(directory=BASE_DIR / "app" / "static"), name="static")
+static_assets.build()
+templates.env.globals["static_url"] = static_assets.url
+app.mount("/static", HashedStaticFiles(static_assets), name="static")
+
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, quality=settings.compression.brotli_quality,
+                       minimum_size=settings.compression.minimum_size, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.compression.minimum_size)
+# Добавлен последним, поэтому внешний: время включает сжатие ответа
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
+
+def collect_cache_metrics():
+    stats = recipe_cache.stats()
+    yield "recipe_cache_entries", "gauge", "Entries in the recipe cache", {}, stats["size"]
+    for name in ("hits", "misses", "evictions"):
+        yield f"recipe_cache_{name}_total", "counter", f"Recipe cache {name}", {}, stats[name]
+
+
+def collect_pool_metrics():
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["replica"] = read_engine
+    for name, db_engine in engines.items():
+        stats = pool_status(db_engine)
+        labels = {"engine": name}
+        if "checked_out" in stats:
+            yield "db_pool_checked_out", "gauge", "Connections checked out of the pool", labels, stats["checked_out"]
+            yield "db_pool_saturation", "gauge", "Checked out connections / pool capacity", labels, stats["saturation"]
+        if "checkouts" in stats:
+            yield "db_pool_checkouts_total", "counter", "Connections checked out", labels, stats["checkouts"]
+            yield "db_pool_timeouts_total", "counter", "Pool checkout timeouts", labels, stats["timeouts"]
+            yield ("db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection", labels,
+                   stats["wait_seconds_total"])
+
+
+metrics.add_collector(collect_cache_metrics)
+metrics.add_collector(collect_pool_metrics)
+
+
+@app.exception_handler(auth_utils.AuthPoolSaturated)
+async def auth_pool_saturated_handler(request: Request, exc: auth_utils.AuthPoolSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service is busy, try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match сравнивается слабо: W/"x" совпадает с "x"
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def etag_headers(etag: str) -> dict:
+    # no-cache: браузер хранит ответ, но перед использованием сверяет ETag
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
 
 
 def verify_token(token: str):
     try:
-        payload = auth_utils.decode_jwt(token)
+        payload = auth_utils.decode_jwt_cached(token)
         return payload
     except jwt.ExpiredSignatureError:
         return None
@@ -43,7 +133,7 @@ def verify_token(token: str):
         return None
 
 
-def get_current_user(access_token: str = Cookie(default=None)):
+async def get_current_user(access_token: str = Cookie(default=None)):
     if access_token:
         payload = verify_token(access_token)
         if payload:
@@ -52,20 +142,42 @@ def get_current_user(access_token: str = Cookie(default=None)):
 
 
 @app.get("/", response_class=RedirectResponse)
-async def root(request: Request, user: dict | None = Depends(get_current_user)):
+async def root(request: Request, db: AsyncSession = Depends(get_read_db),
+               user: dict | None = Depends(get_current_user)):
     if not user:
         return RedirectResponse("/login")
-    return templates.TemplateResponse("recipes.html", {"request": request})
+    # Первая страница и популярное рендерятся сразу из тех же кэшированных запросов, что и API,
+    # без второго запроса со страницы
+    version = await RecipeCrud.get_catalog_version(db)
+    recipes, next_cursor = await CachedRecipeCrud.get_recipes_by_filters(db, limit=RECIPES_PAGE_SIZE,
+                                                                         version=version)
+    popular = await CachedRecipeCrud.get_popular_recipes(db, limit=POPULAR_STRIP_SIZE, version=version)
+    return templates.TemplateResponse("recipes.html", {
+        "request": request, "recipes": recipes, "next_cursor": next_cursor, "popular": popular,
+    })
 
 
 @app.get("/recipe/{recipe_id}", response_model=RecipeBase)
 async def recipe_page(
+        recipe_id: int,
         request: Request,
+        db: AsyncSession = Depends(get_read_db),
         user: dict | None = Depends(get_current_user)
 ):
     if not user:
         return RedirectResponse(url="/login")
-    return templates.TemplateResponse("recipe_detail.html", {"request": request})
+    version = await RecipeCrud.get_recipe_version(db, recipe_id)
+    recipe = await CachedRecipeCrud.get_recipe(db, recipe_id, version=version) if version is not None else None
+    if not recipe:
+        return templates.TemplateResponse("recipe_detail.html", {"request": request, "recipe": None, "reviews_cursor": None},
+                                          status_code=status.HTTP_404_NOT_FOUND)
+    reviews, reviews_cursor = await RecipeCrud.get_reviews_for_recipe(db, recipe_id)
+    histogram = await RecipeCrud.get_rating_histogram(db, recipe_id)
+    similar = await RecipeCrud.get_similar_recipes(db, recipe_id, limit=SIMILAR_STRIP_SIZE)
+    return templates.TemplateResponse("recipe_detail.html", {
+        "request": request, "recipe": recipe, "reviews": reviews, "reviews_cursor": reviews_cursor,
+        "histogram": histogram, "similar": similar,
+    })
 
 
 @app.get("/register", response_class=HTMLResponse)
@@ -128,46 +240,170 @@ async def login_post(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     return response
 
 
-@app.get("/api/recipes", response_model=List[RecipeBase])
-async def get_all_recipes(db: AsyncSession = Depends(get_db), user: dict | None = Depends(get_current_user)):
+async def stream_recipes(**filters):
+    # Сессия открывается внутри генератора: зависимость get_read_db закрывается до отправки тела ответа
+    async with read_session() as db:
+        async for recipe in RecipeCrud.stream_recipes_by_filters(db, **filters):
+            yield orjson.dumps(dict(recipe._mapping)) + b"\n"
+
+
+RecipeSort = Literal["id", "cooking_time", "rating", "popularity"]
+
+
+# Списки рецептов отдаются через ORJSONResponse из строк с колонками RecipeSummary: FastAPI не валидирует
+# возвращённый Response, а response_model остаётся только для схемы OpenAPI. Вывод совпадает побайтно
+async def get_recipes_page(request: Request, db: AsyncSession, sort: str, cursor: str | None, limit: int,
+                           stream: bool, **filters):
+    if stream:
+        return StreamingResponse(stream_recipes(sort=sort, **filters), media_type="application/x-ndjson")
+    # Версия каталога меняется при любой записи в рецепты, остальное (фильтры, курсор) уже есть в URL
+    version = await RecipeCrud.get_catalog_version(db)
+    etag = make_etag("c", version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        recipes, next_cursor = await CachedRecipeCrud.get_recipes_by_filters(db, sort=sort, cursor=cursor,
+                                                                             limit=limit, version=version, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ORJSONResponse({"items": recipes, "next_cursor": next_cursor}, headers=etag_headers(etag))
+
+
+@app.get("/api/recipes", response_model=RecipePage)
+async def get_all_recipes(
+        request: Request,
+        sort: RecipeSort = "id",
+        cursor: str | None = None,
+        limit: int = Query(50, ge=1, le=200),
+        stream: bool = False,
+        db: AsyncSession = Depends(get_read_db),
+        user: dict | None = Depends(get_current_user)
+):
     if not user:
         return RedirectResponse(url="/login")
-    return await RecipeCrud.get_recipes_by_filters(db)
+    return await get_recipes_page(request, db, sort, cursor, limit, stream)
 
 
-@app.get("/api/recipes/popular", response_model=List[RecipeBase])
-async def get_popular_recipes(db: AsyncSession = Depends(get_db),
+@app.get("/api/recipes/popular", response_model=List[RecipeSummary])
+async def get_popular_recipes(request: Request,
+                              db: AsyncSession = Depends(get_read_db),
                               limit: int = Query(10, ge=1),
+                              cuisine: str | None = Query(None),
                               user: dict | None = Depends(get_current_user)):
     if not user:
         return RedirectResponse(url="/login")
-    return await RecipeCrud.get_popular_recipes(db, limit=limit)
+    version = await RecipeCrud.get_catalog_version(db)
+    etag = make_etag("p", version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    recipes = await CachedRecipeCrud.get_popular_recipes(db, limit=limit, version=version, cuisine=cuisine)
+    return ORJSONResponse(recipes, headers=etag_headers(etag))
+
+
+@app.get("/api/recipes/recommended", response_model=List[RecipeSummary])
+async def get_recommended_recipes(limit: int = Query(10, ge=1, le=50),
+                                  db: AsyncSession = Depends(get_read_db),
+                                  user: dict | None = Depends(get_current_user)):
+    if not user:
+        return RedirectResponse(url="/login")
+    recipes = await RecipeCrud.get_recommended_recipes(db, int(user["sub"]), limit=limit)
+    if recipes:
+        return ORJSONResponse(recipe_rows_to_dicts(recipes))
+    # Пользователь без отзывов ещё не попал в пересчёт: вместо рекомендаций популярное
+    version = await RecipeCrud.get_catalog_version(db)
+    return ORJSONResponse(await CachedRecipeCrud.get_popular_recipes(db, limit=limit, version=version))
 
 
-@app.get("/api/recipes/filter/", response_model=List[RecipeBase])
+@app.get("/api/recipes/filter/", response_model=RecipePage)
 async def get_recipes_by_filter(
-        cuisine: str | None = None,
+        request: Request,
+        cuisine: List[str] | None = Query(None),
+        min_cooking_time: int | None = None,
+        max_cooking_time: int | None = None,
+        min_rating: float | None = None,
+        min_ratings_count: int | None = None,
+        sort: RecipeSort = "id",
+        cursor: str | None = None,
+        limit: int = Query(50, ge=1, le=200),
+        stream: bool = False,
+        db: AsyncSession = Depends(get_read_db),
+        user: dict | None = Depends(get_current_user)
+):
+    if not user:
+        return RedirectResponse(url="/login")
+    return await get_recipes_page(request, db, sort, cursor, limit, stream, cuisines=cuisine,
+                                  min_cooking_time=min_cooking_time, max_cooking_time=max_cooking_time,
+                                  min_rating=min_rating, min_ratings_count=min_ratings_count)
+
+
+@app.get("/api/recipes/search", response_model=RecipePage)
+async def search_recipes(
+        q: str = Query(min_length=1, max_length=200),
+        cuisine: List[str] | None = Query(None),
+        min_cooking_time: int | None = None,
         max_cooking_time: int | None = None,
-        db: AsyncSession = Depends(get_db),
+        cursor: str | None = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_read_db),
+        user: dict | None = Depends(get_current_user)
+):
+    if not user:
+        return RedirectResponse(url="/login")
+    try:
+        recipes, next_cursor = await RecipeCrud.search_recipes(
+            db, q, cursor=cursor, limit=limit, cuisines=cuisine,
+            min_cooking_time=min_cooking_time, max_cooking_time=max_cooking_time
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ORJSONResponse({"items": recipe_rows_to_dicts(recipes), "next_cursor": next_cursor})
+
+
+@app.get("/api/recipes/by-ingredients", response_model=List[RecipeMatch])
+async def get_recipes_by_ingredients(
+        ingredient: List[str] = Query(min_length=1, max_length=50),
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_read_db),
         user: dict | None = Depends(get_current_user)
 ):
     if not user:
         return RedirectResponse(url="/login")
-    return await RecipeCrud.get_recipes_by_filters(db, cuisine=cuisine, max_cooking_time=max_cooking_time)
+    matches = await RecipeCrud.get_recipes_by_ingredients(db, ingredient, limit=limit)
+    return [RecipeMatch.model_validate({**match._mapping, "coverage": match.coverage or 0.0}) for match in matches]
 
 
 @app.get("/api/recipe/{recipe_id}", response_model=RecipeBase)
 async def get_recipe_details(
         recipe_id: int,
-        db: AsyncSession = Depends(get_db),
+        request: Request,
+        db: AsyncSession = Depends(get_read_db),
         user: dict | None = Depends(get_current_user)
 ):
     if not user:
         return RedirectResponse(url="/login")
-    recipe = await RecipeCrud.get_recipe(db, recipe_id)
+    version = await RecipeCrud.get_recipe_version(db, recipe_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    etag = make_etag("r", recipe_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    recipe = await CachedRecipeCrud.get_recipe(db, recipe_id, version=version)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    return recipe
+    return ORJSONResponse(recipe.model_dump(), headers=etag_headers(etag))
+
+
+@app.get("/api/recipe/{recipe_id}/similar", response_model=List[RecipeSummary])
+async def get_similar_recipes(
+        recipe_id: int,
+        limit: int = Query(10, ge=1, le=50),
+        db: AsyncSession = Depends(get_read_db),
+        user: dict | None = Depends(get_current_user)
+):
+    if not user:
+        return RedirectResponse(url="/login")
+    recipes = await RecipeCrud.get_similar_recipes(db, recipe_id, limit=limit)
+    return ORJSONResponse(recipe_rows_to_dicts(recipes))
 
 
 @app.post("/api/addreview")
@@ -177,8 +413,7 @@ async def add_review(review_data: ReviewBase, recipe_id: int, db: AsyncSession =
 
     user_id = int(user["sub"])
 
-    recipe = await RecipeCrud.get_recipe(db, recipe_id)
-    if not recipe:
+    if not await RecipeCrud.recipe_exists(db, recipe_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Recipe not found"
@@ -191,22 +426,40 @@ async def add_review(review_data: ReviewBase, recipe_id: int, db: AsyncSession =
         rating=review_data.rating,
         text=review_data.text
     )
+    if not new_review:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recipe not found"
+        )
 
     response = JSONResponse(content={"success": True, "review_id": new_review.id})
     return response
 
 
-@app.get("/api/reviews/{recipe_id}", response_model=List[ReviewResponse])
+@app.get("/api/reviews/{recipe_id}", response_model=ReviewPage)
 async def get_reviews(
         recipe_id: int,
-        db: AsyncSession = Depends(get_db),
+        cursor: str | None = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_read_db),
         user: dict | None = Depends(get_current_user)
 ):
     if not user:
         return RedirectResponse(url="/login")
 
-    reviews = await RecipeCrud.get_reviews_for_recipe(db, recipe_id)
-    return reviews
+    try:
+        reviews, next_cursor = await RecipeCrud.get_reviews_for_recipe(db, recipe_id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Распределение оценок нужно один раз, поэтому считается только для первой страницы
+    histogram = None if cursor else await RecipeCrud.get_rating_histogram(db, recipe_id)
+    return ReviewPage(items=[ReviewResponse.model_validate(review) for review in reviews], next_cursor=next_cursor,
+                      histogram=histogram)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,269 @@
+import logging
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.database.crud import dialect_insert
+from app.database.models import Review, RecipeNeighbour, UserRecommendation, Watermark
+from app.recommendations.matrix import l2_normalize_rows, iter_top_k
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "recommendations"
+WRITE_BATCH = 500
+
+
+def lookup(sorted_ids: np.ndarray, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Номера ids в отсортированном массиве и маска найденных"""
+    positions = np.searchsorted(sorted_ids, ids)
+    found = positions < len(sorted_ids)
+    found[found] = sorted_ids[positions[found]] == ids[found]
+    return positions, found
+
+
+class RatingMatrix:
+    """Разреженная матрица оценок: строки - пользователи, столбцы - рецепты, id обоих по возрастанию"""
+
+    def __init__(self, user_ids: np.ndarray, recipe_ids: np.ndarray, ratings: sparse.csr_matrix):
+        self.user_ids = user_ids
+        self.recipe_ids = recipe_ids
+        self.ratings = ratings
+
+    @classmethod
+    def from_triples(cls, users: np.ndarray, recipes: np.ndarray, ratings: np.ndarray) -> "RatingMatrix":
+        user_ids, rows = np.unique(users, return_inverse=True)
+        recipe_ids, columns = np.unique(recipes, return_inverse=True)
+        matrix = sparse.csr_matrix((ratings.astype(np.float32), (rows, columns)),
+                                   shape=(len(user_ids), len(recipe_ids)))
+        return cls(user_ids, recipe_ids, matrix)
+
+    def user_rows(self, user_ids) -> np.ndarray:
+        positions, found = lookup(self.user_ids, np.array(sorted(user_ids), dtype=np.int64))
+        return positions[found]
+
+    def recipe_columns(self, recipe_ids) -> np.ndarray:
+        positions, found = lookup(self.recipe_ids, np.array(sorted(recipe_ids), dtype=np.int64))
+        return positions[found]
+
+    def centered(self, shrinkage: float) -> sparse.csr_matrix:
+        """
+        Оценки минус средняя оценка пользователя. Среднее сглажено к общему, как будто у каждого есть
+        ещё shrinkage средних отзывов: иначе у пользователя с одним отзывом оценка обнуляется
+        """
+        counts = np.diff(self.ratings.indptr)
+        sums = np.asarray(self.ratings.sum(axis=1)).ravel()
+        global_mean = sums.sum() / max(counts.sum(), 1)
+        means = (sums + shrinkage * global_mean) / (counts + shrinkage)
+        centered = self.ratings.copy()
+        centered.data -= np.repeat(means, counts).astype(np.float32)
+        centered.eliminate_zeros()
+        return centered
+
+
+async def load_ratings(db: AsyncSession, last_review_id: int) -> RatingMatrix:
+    # Повторные отзывы пользователя на один рецепт усредняются; строки читаются пачками
+    # и сразу складываются в компактные массивы
+    query = (
+        select(Review.user_id, Review.recipe_id, func.avg(Review.rating))
+        .where(Review.id <= last_review_id, Review.user_id.is_not(None), Review.recipe_id.is_not(None))
+        .group_by(Review.user_id, Review.recipe_id)
+    )
+    users, recipes, ratings = [], [], []
+    result = await db.stream(query.execution_options(yield_per=settings.recommendations.read_batch))
+    async for partition in result.partitions():
+        block = np.array(partition, dtype=np.float64)
+        users.append(block[:, 0].astype(np.int64))
+        recipes.append(block[:, 1].astype(np.int64))
+        ratings.append(block[:, 2].astype(np.float32))
+    if not users:
+        return RatingMatrix.from_triples(np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32))
+    return RatingMatrix.from_triples(np.concatenate(users), np.concatenate(recipes), np.concatenate(ratings))
+
+
+async def replace_lists(db: AsyncSession, model, owner_column: str, item_column: str,
+                        lists: dict[int, list[tuple[int, float]]]):
+    owner = getattr(model, owner_column)
+    owner_ids = list(lists)
+    for start in range(0, len(owner_ids), WRITE_BATCH):
+        batch = owner_ids[start:start + WRITE_BATCH]
+        await db.execute(delete(model).where(owner.in_(batch)))
+        rows = [{owner_column: owner_id, item_column: item_id, "score": score}
+                for owner_id in batch for item_id, score in lists[owner_id]]
+        if rows:
+            await db.execute(insert(model), rows)
+
+
+async def save_top_k(db: AsyncSession, model, owner_column: str, item_column: str, owner_ids: np.ndarray,
+                     item_ids: np.ndarray, results, collect: bool = False) -> sparse.csr_matrix | None:
+    """
+    Записывает вывод iter_top_k пачками, не держа все списки в памяти.
+    С collect возвращает их разреженной матрицей: строка на каждую строку запросов
+    """
+    data, indices, indptr = [], [], [0]
+    lists = {}
+    for row, columns, scores in results:
+        lists[int(owner_ids[row])] = list(zip(item_ids[columns].tolist(), scores.tolist()))
+        if collect:
+            data.append(scores)
+            indices.append(columns)
+            indptr.append(indptr[-1] + len(columns))
+        if len(lists) >= WRITE_BATCH:
+            await replace_lists(db, model, owner_column, item_column, lists)
+            lists = {}
+    await replace_lists(db, model, owner_column, item_column, lists)
+    if not collect:
+        return None
+    return sparse.csr_matrix((np.concatenate(data) if data else np.empty(0, np.float32),
+                              np.concatenate(indices) if indices else np.empty(0, np.int64), indptr),
+                             shape=(len(indptr) - 1, len(item_ids)))
+
+
+async def load_similarity(db: AsyncSession, ratings: RatingMatrix, recipe_ids: np.ndarray) -> sparse.csr_matrix:
+    """Строки матрицы сходств для recipe_ids из recipe_neighbours, в нумерации столбцов ratings"""
+    owners, neighbours, scores = [], [], []
+    for start in range(0, len(recipe_ids), WRITE_BATCH):
+        result = await db.execute(
+            select(RecipeNeighbour.recipe_id, RecipeNeighbour.neighbour_id, RecipeNeighbour.score)
+            .where(RecipeNeighbour.recipe_id.in_(recipe_ids[start:start + WRITE_BATCH].tolist()))
+        )
+        for recipe_id, neighbour_id, score in result:
+            owners.append(recipe_id)
+            neighbours.append(neighbour_id)
+            scores.append(score)
+    rows, rows_found = lookup(ratings.recipe_ids, np.array(owners, dtype=np.int64))
+    columns, columns_found = lookup(ratings.recipe_ids, np.array(neighbours, dtype=np.int64))
+    found = rows_found & columns_found
+    n = len(ratings.recipe_ids)
+    return sparse.csr_matrix((np.array(scores, dtype=np.float32)[found], (rows[found], columns[found])), shape=(n, n))
+
+
+def recommend(ratings: RatingMatrix, centered: sparse.csr_matrix, similarity: sparse.csr_matrix,
+              user_rows: np.ndarray):
+    """
+    Оценка рецепта j для пользователя u: сумма по его отзывам (оценка_ui - среднее_u) * сходство(i, j).
+    Рецепты, на которые пользователь уже оставил отзыв, не рекомендуются
+    """
+    config = settings.recommendations
+    # iter_top_k умножает запросы на транспонированные items, поэтому передаётся similarity.T
+    return iter_top_k(centered[user_rows], similarity.T.tocsr(), config.top_n, config.max_block_elements,
+                      exclude_matrix=ratings.ratings[user_rows])
+
+
+async def get_last_review_id(db: AsyncSession) -> int:
+    return await db.scalar(select(func.coalesce(func.max(Review.id), 0)))
+
+
+async def set_watermark(db: AsyncSession, last_id: int):
+    statement = dialect_insert(db)(Watermark).values(name=WATERMARK_NAME, last_id=last_id)
+    await db.execute(statement.on_conflict_do_update(index_elements=[Watermark.name], set_={"last_id": last_id}))
+
+
+async def rebuild_recommendations(db: AsyncSession) -> int:
+    """
+    Полный пересчёт: сходства всех рецептов по скорректированному косинусу и рекомендации
+    всем пользователям с отзывами. Возвращает число пользователей
+    """
+    config = settings.recommendations
+    last_review_id = await get_last_review_id(db)
+    ratings = await load_ratings(db, last_review_id)
+    centered = ratings.centered(config.mean_shrinkage)
+    items = l2_normalize_rows(centered.T.tocsr())
+
+    await db.execute(delete(RecipeNeighbour))
+    similarity = await save_top_k(
+        db, RecipeNeighbour, "recipe_id", "neighbour_id", ratings.recipe_ids, ratings.recipe_ids,
+        iter_top_k(items, items, config.neighbours, config.max_block_elements, exclude=np.arange(items.shape[0])),
+        collect=True,
+    )
+    await db.execute(delete(UserRecommendation))
+    user_rows = np.arange(len(ratings.user_ids))
+    await save_top_k(db, UserRecommendation, "user_id", "recipe_id", ratings.user_ids, ratings.recipe_ids,
+                     recommend(ratings, centered, similarity, user_rows))
+    await set_watermark(db, last_review_id)
+    await db.commit()
+    logger.info("Recommendations rebuilt: %d recipes, %d users", len(ratings.recipe_ids), len(ratings.user_ids))
+    return len(user_rows)
+
+
+async def refresh_recommendations(db: AsyncSession) -> int:
+    """
+    Инкрементальный пересчёт по отзывам после watermark. Заново считаются списки соседей рецептов
+    с новыми отзывами и рекомендации их авторов; в списках остальных рецептов заменяются только
+    сходства с изменёнными. Сдвиг средних и отзывы из транзакций, закоммиченных позже watermark
+    с меньшим id, учитывает периодическая полная пересборка. Без watermark выполняется полная.
+    Возвращает число пересчитанных пользователей
+    """
+    config = settings.recommendations
+    watermark = await db.scalar(select(Watermark.last_id).where(Watermark.name == WATERMARK_NAME))
+    if watermark is None:
+        return await rebuild_recommendations(db)
+    last_review_id = await get_last_review_id(db)
+    if last_review_id <= watermark:
+        return 0
+
+    changed = (await db.execute(
+        select(Review.user_id, Review.recipe_id).where(Review.id > watermark, Review.id <= last_review_id)
+    )).all()
+    ratings = await load_ratings(db, last_review_id)
+    centered = ratings.centered(config.mean_shrinkage)
+    items = l2_normalize_rows(centered.T.tocsr())
+
+    changed_columns = ratings.recipe_columns({recipe_id for _, recipe_id in changed if recipe_id is not None})
+    changed_ids = ratings.recipe_ids[changed_columns]
+    await save_top_k(
+        db, RecipeNeighbour, "recipe_id", "neighbour_id", changed_ids, ratings.recipe_ids,
+        iter_top_k(items[changed_columns], items, config.neighbours, config.max_block_elements,
+                   exclude=changed_columns),
+    )
+
+    # Обратное направление: у остальных рецептов сходства с изменёнными заменяются новыми
+    other_columns = np.setdiff1d(np.arange(len(ratings.recipe_ids)), changed_columns)
+    candidates = {}
+    for offset, columns, scores in iter_top_k(items[other_columns], items[changed_columns], config.neighbours,
+                                              config.max_block_elements):
+        if len(columns):
+            candidates[int(ratings.recipe_ids[other_columns[offset]])] = list(zip(changed_ids[columns].tolist(),
+                                                                                  scores.tolist()))
+    changed_set = set(changed_ids.tolist())
+    affected = set(candidates)
+    for start in range(0, len(changed_ids), WRITE_BATCH):
+        result = await db.execute(
+            select(RecipeNeighbour.recipe_id)
+            .where(RecipeNeighbour.neighbour_id.in_(changed_ids[start:start + WRITE_BATCH].tolist()))
+        )
+        affected.update(recipe_id for recipe_id in result.scalars() if recipe_id not in changed_set)
+
+    affected = sorted(affected)
+    current: dict[int, dict[int, float]] = {}
+    for start in range(0, len(affected), WRITE_BATCH):
+        result = await db.execute(
+            select(RecipeNeighbour.recipe_id, RecipeNeighbour.neighbour_id, RecipeNeighbour.score)
+            .where(RecipeNeighbour.recipe_id.in_(affected[start:start + WRITE_BATCH]))
+        )
+        for recipe_id, neighbour_id, score in result:
+            current.setdefault(recipe_id, {})[neighbour_id] = score
+
+    lists = {}
+    for recipe_id in affected:
+        previous = current.get(recipe_id, {})
+        merged = {neighbour_id: score for neighbour_id, score in previous.items() if neighbour_id not in changed_set}
+        merged.update(candidates.get(recipe_id, []))
+        top = sorted(merged.items(), key=lambda item: -item[1])[:config.neighbours]
+        if top != sorted(previous.items(), key=lambda item: -item[1]):
+            lists[recipe_id] = top
+    await replace_lists(db, RecipeNeighbour, "recipe_id", "neighbour_id", lists)
+
+    # Рекомендации авторов новых отзывов: нужны строки сходств только для рецептов, которые они оценили
+    user_rows = ratings.user_rows({user_id for user_id, _ in changed if user_id is not None})
+    rated_columns = np.unique(ratings.ratings[user_rows].indices)
+    similarity = await load_similarity(db, ratings, ratings.recipe_ids[rated_columns])
+    await save_top_k(db, UserRecommendation, "user_id", "recipe_id", ratings.user_ids[user_rows], ratings.recipe_ids,
+                     recommend(ratings, centered, similarity, user_rows))
+    await set_watermark(db, last_review_id)
+    await db.commit()
+    logger.info("Recommendations refreshed: %d recipes, %d users", len(changed_ids), len(user_rows))
+    return len(user_rows)
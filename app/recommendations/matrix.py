@@ -0,0 +1,49 @@
+import numpy as np
+from scipy import sparse
+
+
+def l2_normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """Нормирует строки, чтобы скалярное произведение строк было косинусным сходством"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix, dtype=np.float32)
+
+
+def iter_top_k(queries: sparse.csr_matrix, items: sparse.csr_matrix, k: int, max_block_elements: int,
+               exclude: np.ndarray = None, exclude_matrix: sparse.csr_matrix = None):
+    """
+    Для каждой строки queries находит k строк items с наибольшим скалярным произведением.
+    Сходства считаются блоками строк: плотный блок не больше max_block_elements значений,
+    поэтому память не растёт квадратично с числом рецептов.
+    exclude - номер строки items, которую нельзя возвращать для строки queries (сам рецепт), -1 если нет.
+    exclude_matrix - то же для нескольких строк: ненулевые элементы строки (рецепты, уже оценённые пользователем).
+    Отдаёт (номер строки queries, номера строк items, сходства) по убыванию сходства, только сходства > 0
+    """
+    n_items = items.shape[0]
+    k = min(k, n_items)
+    if k == 0:
+        return
+    items_t = items.T.tocsc()
+    block_size = max(1, max_block_elements // max(n_items, 1))
+
+    for start in range(0, queries.shape[0], block_size):
+        stop = min(start + block_size, queries.shape[0])
+        scores = (queries[start:stop] @ items_t).toarray().astype(np.float32, copy=False)
+        if exclude is not None:
+            rows = np.arange(stop - start)
+            excluded = exclude[start:stop]
+            mask = excluded >= 0
+            scores[rows[mask], excluded[mask]] = -np.inf
+        if exclude_matrix is not None:
+            excluded = exclude_matrix[start:stop].tocoo()
+            scores[excluded.row, excluded.col] = -np.inf
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for offset in range(stop - start):
+            positive = top_scores[offset] > 0
+            yield start + offset, top[offset][positive], top_scores[offset][positive]
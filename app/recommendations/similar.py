@@ -0,0 +1,230 @@
+import logging
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.database.models import Recipe, RecipeIngredient, Ingredient, RecipeSimilar
+from app.recommendations.matrix import l2_normalize_rows, iter_top_k
+from app.utils.ingredients import singularize
+
+logger = logging.getLogger(__name__)
+
+# Вес групп признаков: общие ингредиенты важнее кухни, кухня важнее слов описания
+FIELD_WEIGHTS = {"ing": 1.0, "cuisine": 0.6, "word": 0.4}
+MIN_WORD_DF = 2  # слова, встретившиеся только в одном рецепте, ничего не связывают
+WORD_PATTERN = re.compile(r"[a-z]{3,}")
+STOP_WORDS = {
+    "the", "and", "for", "with", "into", "until", "then", "from", "over", "add", "cook", "minute", "minutes",
+    "recipe", "ingredient", "instruction", "category", "cuisine", "serve", "heat", "stir", "about", "your",
+    "this", "that", "are", "each", "all", "large", "small", "medium", "cup", "tbsp", "tsp", "while",
+}
+WRITE_BATCH = 500
+
+
+def recipe_terms(title: str, cuisine: str, description: str, giga_chat_description: str,
+                 ingredients: list[str]) -> Counter:
+    """Признаки рецепта: нормализованные ингредиенты, кухня и слова текстов с префиксом группы"""
+    terms = Counter(f"ing:{name}" for name in ingredients)
+    if cuisine:
+        terms[f"cuisine:{cuisine.lower()}"] += 1
+    text = " ".join(part for part in (title, giga_chat_description, description) if part).lower()
+    terms.update(f"word:{singularize(word)}" for word in WORD_PATTERN.findall(text) if word not in STOP_WORDS)
+    return terms
+
+
+class SimilarityIndex:
+    """
+    TF-IDF матрица рецептов (строки нормированы) со словарём и весами столбцов.
+    Хранится в файле, чтобы новые рецепты векторизовались в том же пространстве без полной пересборки
+    """
+
+    def __init__(self, recipe_ids: np.ndarray, matrix: sparse.csr_matrix, terms: np.ndarray, weights: np.ndarray):
+        self.recipe_ids = recipe_ids
+        self.matrix = matrix
+        self.terms = terms
+        self.weights = weights
+        self.vocabulary = {term: column for column, term in enumerate(terms.tolist())}
+
+    @classmethod
+    def fit(cls, documents: dict[int, Counter]) -> "SimilarityIndex":
+        df = Counter()
+        for terms in documents.values():
+            df.update(terms.keys())
+        vocabulary = sorted(term for term, count in df.items() if count >= MIN_WORD_DF or not term.startswith("word:"))
+        n = len(documents)
+        weights = np.array([
+            (math.log((1 + n) / (1 + df[term])) + 1) * FIELD_WEIGHTS[term.split(":", 1)[0]] for term in vocabulary
+        ], dtype=np.float32)
+        index = cls(np.array(list(documents), dtype=np.int64), sparse.csr_matrix((0, len(vocabulary))),
+                    np.array(vocabulary, dtype=object), weights)
+        index.matrix = index.transform(documents.values())
+        return index
+
+    def transform(self, documents) -> sparse.csr_matrix:
+        """Векторы документов в словаре индекса; незнакомые термины пропускаются до следующей пересборки"""
+        data, indices, indptr = [], [], [0]
+        for terms in documents:
+            for term, count in terms.items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    indices.append(column)
+                    data.append((1 + math.log(count)) * self.weights[column])
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix((np.array(data, dtype=np.float32), indices, indptr),
+                                   shape=(len(indptr) - 1, len(self.terms)))
+        return l2_normalize_rows(matrix)
+
+    def replace_rows(self, recipe_ids: list[int], matrix: sparse.csr_matrix) -> np.ndarray:
+        """Убирает старые строки этих рецептов и дописывает новые; возвращает их номера в матрице"""
+        keep = ~np.isin(self.recipe_ids, recipe_ids)
+        self.matrix = sparse.vstack([self.matrix[keep], matrix], format="csr")
+        self.recipe_ids = np.concatenate([self.recipe_ids[keep], np.array(recipe_ids, dtype=np.int64)])
+        return np.arange(self.matrix.shape[0] - len(recipe_ids), self.matrix.shape[0])
+
+    def save(self, path: Path):
+        temp_path = path.with_name(path.name + ".tmp.npz")
+        np.savez(temp_path, recipe_ids=self.recipe_ids, data=self.matrix.data, indices=self.matrix.indices,
+                 indptr=self.matrix.indptr, shape=np.array(self.matrix.shape), terms=self.terms.astype(str),
+                 weights=self.weights)
+        temp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "SimilarityIndex":
+        with np.load(path) as stored:
+            matrix = sparse.csr_matrix((stored["data"], stored["indices"], stored["indptr"]),
+                                       shape=tuple(stored["shape"]))
+            return cls(stored["recipe_ids"], matrix, stored["terms"].astype(object), stored["weights"])
+
+
+async def load_documents(db: AsyncSession, recipe_ids: list[int] = None) -> dict[int, Counter]:
+    # Большие текстовые колонки выбираются явно: в модели они отложенные
+    recipes_query = select(Recipe.id, Recipe.title, Recipe.cuisine, Recipe.description,
+                           Recipe.giga_chat_description).order_by(Recipe.id)
+    links_query = select(RecipeIngredient.recipe_id, Ingredient.name).join(
+        Ingredient, Ingredient.id == RecipeIngredient.ingredient_id
+    )
+    if recipe_ids is not None:
+        recipes_query = recipes_query.where(Recipe.id.in_(recipe_ids))
+        links_query = links_query.where(RecipeIngredient.recipe_id.in_(recipe_ids))
+
+    ingredients: dict[int, list[str]] = {}
+    for recipe_id, name in await db.execute(links_query):
+        ingredients.setdefault(recipe_id, []).append(name)
+
+    documents = {}
+    result = await db.stream(recipes_query.execution_options(yield_per=1000))
+    async for recipe_id, title, cuisine, description, giga_chat_description in result:
+        documents[recipe_id] = recipe_terms(title, cuisine, description, giga_chat_description,
+                                            ingredients.get(recipe_id, []))
+    return documents
+
+
+def top_k_neighbours(index: SimilarityIndex, rows: np.ndarray, k: int) -> dict[int, list[tuple[int, float]]]:
+    """Ближайшие рецепты для строк rows индекса, сам рецепт исключается"""
+    neighbours = {}
+    for offset, columns, scores in iter_top_k(index.matrix[rows], index.matrix, k,
+                                              settings.similar_recipes.max_block_elements, exclude=rows):
+        neighbours[int(index.recipe_ids[rows[offset]])] = list(zip(index.recipe_ids[columns].tolist(),
+                                                                   scores.tolist()))
+    return neighbours
+
+
+async def save_neighbours(db: AsyncSession, neighbours: dict[int, list[tuple[int, float]]]):
+    recipe_ids = list(neighbours)
+    for start in range(0, len(recipe_ids), WRITE_BATCH):
+        batch = recipe_ids[start:start + WRITE_BATCH]
+        await db.execute(delete(RecipeSimilar).where(RecipeSimilar.recipe_id.in_(batch)))
+        rows = [{"recipe_id": recipe_id, "similar_id": similar_id, "score": score}
+                for recipe_id in batch for similar_id, score in neighbours[recipe_id]]
+        if rows:
+            await db.execute(insert(RecipeSimilar), rows)
+
+
+async def rebuild_similar(db: AsyncSession, k: int = None) -> int:
+    """Полная пересборка: словарь и IDF по всем рецептам, соседи для каждого рецепта"""
+    k = k or settings.similar_recipes.top_k
+    documents = await load_documents(db)
+    index = SimilarityIndex.fit(documents)
+    await db.execute(delete(RecipeSimilar))
+    rows = np.arange(index.matrix.shape[0])
+    for start in range(0, len(rows), WRITE_BATCH):
+        await save_neighbours(db, top_k_neighbours(index, rows[start:start + WRITE_BATCH], k))
+    await db.commit()
+    index.save(settings.similar_recipes.index_path)
+    return len(documents)
+
+
+async def index_matches_catalog(db: AsyncSession, index: SimilarityIndex, recipe_ids: list[int]) -> bool:
+    """В индексе ровно существующие рецепты, кроме ещё не проиндексированных recipe_ids"""
+    existing = set((await db.execute(select(Recipe.id))).scalars())
+    indexed = set(index.recipe_ids.tolist())
+    return indexed <= existing and existing - indexed <= set(recipe_ids)
+
+
+async def update_similar(db: AsyncSession, recipe_ids: list[int], k: int = None):
+    """
+    Инкрементальное обновление после записи рецептов парсером: новые и изменённые рецепты векторизуются
+    в словаре сохранённого индекса, получают своих соседей и при необходимости попадают в списки
+    соседей уже существующих рецептов. Без сохранённого индекса выполняется полная пересборка
+    """
+    k = k or settings.similar_recipes.top_k
+    path = settings.similar_recipes.index_path
+    if not recipe_ids:
+        return
+    if not path.exists():
+        await rebuild_similar(db, k)
+        return
+
+    index = SimilarityIndex.load(path)
+    if not await index_matches_catalog(db, index, recipe_ids):
+        # Каталог очищали или меняли в обход парсеров: соседи из старого индекса указывали бы на чужие id
+        logger.info("Similarity index is out of sync with recipes, rebuilding")
+        await rebuild_similar(db, k)
+        return
+    documents = await load_documents(db, recipe_ids)
+    recipe_ids = list(documents)
+    if not recipe_ids:
+        return
+    new_rows = index.replace_rows(recipe_ids, index.transform(documents.values()))
+    neighbours = top_k_neighbours(index, new_rows, k)
+
+    # Обратное направление: новым рецептам есть место в списках старых, если они ближе их k-го соседа
+    old_rows = np.arange(new_rows[0])
+    candidates = {}
+    for offset, columns, scores in iter_top_k(index.matrix[old_rows], index.matrix[new_rows], k,
+                                              settings.similar_recipes.max_block_elements):
+        if len(columns):
+            candidates[int(index.recipe_ids[offset])] = list(zip(index.recipe_ids[new_rows[columns]].tolist(),
+                                                                 scores.tolist()))
+    # Прежние сходства с изменёнными рецептами заменяются новыми. Если изменённый рецепт больше не входит
+    # в top-k новых кандидатов какого-то рецепта, его старая запись там остаётся до полной пересборки
+    affected = list(candidates)
+    current: dict[int, dict[int, float]] = {}
+    for start in range(0, len(affected), WRITE_BATCH):
+        result = await db.execute(
+            select(RecipeSimilar.recipe_id, RecipeSimilar.similar_id, RecipeSimilar.score)
+            .where(RecipeSimilar.recipe_id.in_(affected[start:start + WRITE_BATCH]))
+        )
+        for recipe_id, similar_id, score in result:
+            current.setdefault(recipe_id, {})[similar_id] = score
+
+    for recipe_id, new_candidates in candidates.items():
+        merged = {similar_id: score for similar_id, score in current.get(recipe_id, {}).items()
+                  if similar_id not in documents}
+        merged.update(new_candidates)
+        top = sorted(merged.items(), key=lambda item: -item[1])[:k]
+        if top != sorted(current.get(recipe_id, {}).items(), key=lambda item: -item[1])[:k]:
+            neighbours[recipe_id] = top
+
+    await save_neighbours(db, neighbours)
+    await db.commit()
+    index.save(path)
+    logger.info("Similar recipes updated for %d recipes", len(neighbours))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class ReviewBase(BaseModel):
@@ -22,6 +22,30 @@ class RecipeBase(BaseModel):
         from_attributes = True
 
 
+class RecipeSummary(BaseModel):
+    """Карточка рецепта в списках: без полного текста и описания GigaChat"""
+    id: int
+    title: str
+    cuisine: Optional[str]
+    average_rating: float
+    ratings_count: int
+    cooking_time: Optional[int]
+    image_url: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+
+class RecipeMatch(RecipeSummary):
+    matched_ingredients: int
+    coverage: float
+
+
+class RecipePage(BaseModel):
+    items: List[RecipeSummary]
+    next_cursor: Optional[str] = None
+
+
 class UserCreate(BaseModel):
     username: str = Field(min_length=3, max_length=10)
     password: str = Field(min_length=6, max_length=10)
@@ -35,4 +59,14 @@ class UserResponse(BaseModel):
 
 
 class ReviewResponse(ReviewBase):
-    user_id: int
\ No newline at end of file
+    id: int
+    user_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class ReviewPage(BaseModel):
+    items: List[ReviewResponse]
+    next_cursor: Optional[str] = None
+    histogram: Optional[Dict[int, int]] = None  # число отзывов по оценкам 1-5, только на первой странице
\ No newline at end of file
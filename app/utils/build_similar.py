@@ -0,0 +1,14 @@
+import asyncio
+from app.database.database import async_session
+from app.recommendations.similar import rebuild_similar
+
+
+async def main():
+    """Полная пересборка похожих рецептов; парсеры дальше обновляют их инкрементально"""
+    async with async_session() as db:
+        count = await rebuild_similar(db)
+    print(f"Обработано рецептов: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
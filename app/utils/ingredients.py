@@ -0,0 +1,64 @@
+import re
+
+# Единицы измерения и слова-описания, которые не входят в название ингредиента
+UNITS = {
+    "g", "gram", "kg", "kilogram", "mg", "ml", "milliliter", "millilitre", "l", "liter", "litre", "dl", "cl",
+    "oz", "ounce", "lb", "pound", "cup", "tbsp", "tbs", "tablespoon", "tsp", "teaspoon", "pint", "quart",
+    "gallon", "pinch", "dash", "handful", "bunch", "clove", "slice", "can", "tin", "jar", "packet", "package",
+    "pkg", "stick", "sprig", "piece", "drop", "splash", "knob", "cube", "sheet", "fillet", "head", "stalk",
+    "inch", "cm", "bottle", "bag", "box", "container", "envelope", "leaf",
+}
+DESCRIPTORS = {
+    "a", "an", "of", "and", "or", "to", "taste", "for", "the", "about", "large", "small", "medium", "fresh",
+    "freshly", "chopped", "finely", "roughly", "coarsely", "thinly", "sliced", "diced", "minced", "grated",
+    "ground", "crushed", "peeled", "softened", "melted", "beaten", "cooked", "uncooked", "dried", "frozen",
+    "optional", "whole", "heaping", "level", "packed", "room", "temperature", "divided", "plus", "more",
+    "cut", "into", "pieces", "halved", "quartered", "shredded", "cubed", "boneless", "skinless", "ripe",
+    "extra", "virgin", "lightly", "well", "drained", "rinsed", "trimmed", "x",
+}
+
+QUANTITY_PATTERN = re.compile(r"[\d½⅓⅔¼¾⅕⅖⅗⅘⅙⅚⅛⅜⅝⅞/.,\-–]+")
+PARENTHESES_PATTERN = re.compile(r"\([^)]*\)")
+
+
+def singularize(word: str) -> str:
+    if len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(raw: str) -> str | None:
+    """
+    Приводит строку ингредиента ("2 cups chopped Onions, peeled") к нормализованному названию ("onion").
+    Возвращает None, если после очистки ничего не осталось.
+    """
+    if not raw:
+        return None
+    text = PARENTHESES_PATTERN.sub(" ", raw.lower())
+    text = text.split(",")[0]
+    text = QUANTITY_PATTERN.sub(" ", text)
+
+    words = []
+    for word in re.findall(r"[a-zà-ÿ]+", text):
+        word = singularize(word)
+        if word in UNITS or word in DESCRIPTORS:
+            continue
+        words.append(word)
+
+    return " ".join(words) or None
+
+
+def normalize_ingredients(items: list[str]) -> list[str]:
+    """Нормализует список ингредиентов, убирая пустые значения и повторы с сохранением порядка"""
+    names = []
+    for item in items:
+        name = normalize_ingredient(item)
+        if name and name not in names:
+            names.append(name)
+    return names
@@ -2,6 +2,8 @@ import json
 import asyncio
 import time
 import random
+from urllib.parse import urljoin, urlparse
+import aiohttp
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -9,9 +11,22 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from app.database.crud import RecipeCrud
 from app.database.database import async_session
-from sberchat import get_short_description
+from app.database.upgrade import upgrade_database
+from app.recommendations.similar import update_similar
+from sberchat import describe_many
 import re
 
+BASE_URL = "https://www.allrecipes.com/"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+CONCURRENCY = 4  # одновременных загрузок страниц
+HOST_DELAY = (1.0, 2.0)  # пауза между запросами к одному хосту, секунды
+DRIVER_POOL_SIZE = 2  # браузеров Selenium для страниц, которым нужен JavaScript
+
+LD_JSON_PATTERN = re.compile(
+    r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I
+)
+RECIPE_LINK_PATTERN = re.compile(r'href=["\'](https?://www\.allrecipes\.com/recipe/[^"\'#?]+)[^"\']*["\']', re.I)
+
 
 def setup_driver():
 	options = webdriver.ChromeOptions()
@@ -83,51 +98,91 @@ def parse_iso8601_duration(duration_str):
 
     return hours * 60 + minutes
 
-def extract_recipe_data(driver):
-    scripts = driver.find_elements(By.XPATH, '//script[@type="application/ld+json"]')
-    for script in scripts:
-        try:
-            content = script.get_attribute('innerHTML')
-            data_json = json.loads(content)
+def extract_ld_json_blocks(source) -> list[str]:
+    """Содержимое блоков JSON-LD из HTML-строки или со страницы, открытой в Selenium"""
+    if isinstance(source, str):
+        return LD_JSON_PATTERN.findall(source)
+    scripts = source.find_elements(By.XPATH, '//script[@type="application/ld+json"]')
+    return [script.get_attribute('innerHTML') for script in scripts]
+
+
+def is_recipe_entry(entry) -> bool:
+    if not isinstance(entry, dict):
+        return False
+    type_field = entry.get('@type')
+    return isinstance(type_field, list) and 'Recipe' in type_field or type_field == 'Recipe'
 
-            def extract_steps(steps_field):
-                steps_text = []
-                if isinstance(steps_field, list):
-                    for step in steps_field:
-                        if isinstance(step, dict) and 'text' in step:
-                            steps_text.append(step['text'])
-                        elif isinstance(step, str):
-                            steps_text.append(step)
-                elif isinstance(steps_field, str):
-                    steps_text.append(steps_field)
-                return steps_text
-
-            if isinstance(data_json, list):
-                for entry in data_json:
-                    if isinstance(entry, dict):
-                        type_field = entry.get('@type')
-                        if isinstance(type_field, list) and 'Recipe' in type_field or type_field == 'Recipe':
-                            ingredients = entry.get('recipeIngredient', [])
-                            cuisine = entry.get('recipeCuisine', 'other')
-                            time_str = entry.get('totalTime', '')
-                            time_minutes = parse_iso8601_duration(time_str)
-                            steps = extract_steps(entry.get('recipeInstructions', []))
-                            image = entry.get('image', {}).get('url') if isinstance(entry.get('image'), dict) else entry.get('image', '')
-                            return ingredients, cuisine, time_minutes, steps, image
-            elif isinstance(data_json, dict):
-                type_field = data_json.get('@type')
-                if isinstance(type_field, list) and 'Recipe' in type_field or type_field == 'Recipe':
-                    ingredients = data_json.get('recipeIngredient', [])
-                    cuisine = data_json.get('recipeCuisine', 'other')
-                    time_str = data_json.get('totalTime', '')
-                    time_minutes = parse_iso8601_duration(time_str)
-                    steps = extract_steps(data_json.get('recipeInstructions', []))
-                    image = data_json.get('image', {}).get('url') if isinstance(data_json.get('image'), dict) else data_json.get('image', '')
-                    return ingredients, cuisine, time_minutes, steps, image
 
+def find_recipe_entry(blocks: list[str]) -> dict | None:
+    """Первая сущность Recipe в блоках JSON-LD (в том числе внутри списка или @graph)"""
+    for content in blocks:
+        try:
+            data_json = json.loads(content)
         except json.JSONDecodeError:
             continue
-    return [], 'other', 0, [], ''
+
+        entries = data_json if isinstance(data_json, list) else [data_json]
+        for entry in entries:
+            if isinstance(entry, dict) and isinstance(entry.get('@graph'), list):
+                entries.extend(entry['@graph'])
+            if is_recipe_entry(entry):
+                return entry
+    return None
+
+
+def extract_steps(steps_field):
+    steps_text = []
+    if isinstance(steps_field, list):
+        for step in steps_field:
+            if isinstance(step, dict) and 'text' in step:
+                steps_text.append(step['text'])
+            elif isinstance(step, str):
+                steps_text.append(step)
+    elif isinstance(steps_field, str):
+        steps_text.append(steps_field)
+    return steps_text
+
+
+def get_recipe_fields(entry: dict):
+    ingredients = entry.get('recipeIngredient', [])
+    cuisine = entry.get('recipeCuisine', 'other')
+    time_minutes = parse_iso8601_duration(entry.get('totalTime', ''))
+    steps = extract_steps(entry.get('recipeInstructions', []))
+    image = entry.get('image', {}).get('url') if isinstance(entry.get('image'), dict) else entry.get('image', '')
+    if isinstance(image, list):
+        image = image[0] if image else ''
+    return ingredients, cuisine, time_minutes, steps, image
+
+
+def extract_recipe_data(source):
+    """
+    Достаёт ингредиенты, кухню, время, шаги и картинку из JSON-LD.
+    source - HTML-строка (например, сохранённая страница) или драйвер Selenium с открытой страницей.
+    """
+    entry = find_recipe_entry(extract_ld_json_blocks(source))
+    if entry is None:
+        return [], 'other', 0, [], ''
+    return get_recipe_fields(entry)
+
+
+def parse_recipe_html(html: str, url: str):
+    """Разбирает страницу рецепта без браузера; None, если на странице нет JSON-LD рецепта"""
+    entry = find_recipe_entry(extract_ld_json_blocks(html))
+    if entry is None or not entry.get('name'):
+        return None
+
+    data = {
+        'title': entry['name'],
+        'description': entry.get('description', '') or '',
+        'cuisine': "",
+        'ingredients': [],
+        'steps': [],
+        'timem': 0,
+        'url': url,
+        'image_url': ""
+    }
+    data['ingredients'], data['cuisine'], data['timem'], data['steps'], data['image_url'] = get_recipe_fields(entry)
+    return data
 
 
 def parse_recipe_page(driver, url):
@@ -167,10 +222,17 @@ def parse_recipe_page(driver, url):
 		print(f"Ошибка парсинга {url}: {str(e)}")
 		return None
 
+def get_cuisine(cuisine):
+	"""recipeCuisine бывает и строкой, и списком"""
+	if isinstance(cuisine, list):
+		return cuisine[0] if cuisine else 'other'
+	return cuisine or 'other'
+
+
 def make_meal_details(meal):
 	"""Выводит полную информацию о блюде"""
 	s = f"""Title: {meal['title']}
-Country: {meal['cuisine'][0]}
+Country: {get_cuisine(meal['cuisine'])}
 Time cooking: {meal['timem']} minutes
 
 Ingredients:
@@ -181,21 +243,122 @@ Instructions:
 """.strip()
 	return s
 
-async def save_recipe(data):
 
-	info = make_meal_details(data)
-	json_string_meal = json.dumps(data)
-	short_info = get_short_description(json_string_meal)
+class PoliteFetcher:
+    """Загрузка страниц через общую сессию: ограничение параллельности и пауза между запросами к одному хосту"""
+
+    def __init__(self, session: aiohttp.ClientSession, concurrency: int = CONCURRENCY, host_delay=HOST_DELAY):
+        self.session = session
+        self.host_delay = host_delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._host_locks: dict[str, asyncio.Lock] = {}
+        self._host_next_time: dict[str, float] = {}
+
+    async def _wait_for_host(self, host: str):
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self._host_next_time.get(host, 0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._host_next_time[host] = time.monotonic() + random.uniform(*self.host_delay)
+
+    async def fetch(self, url: str) -> str | None:
+        async with self._semaphore:
+            await self._wait_for_host(urlparse(url).netloc)
+            try:
+                async with self.session.get(url) as response:
+                    if response.status != 200:
+                        print(f"Ошибка загрузки {url}: HTTP {response.status}")
+                        return None
+                    return await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Ошибка загрузки {url}: {str(e)}")
+                return None
+
+
+class DriverPool:
+    """Пул браузеров Selenium для страниц, которые не отдают рецепт без JavaScript. Браузеры запускаются по требованию"""
+
+    def __init__(self, size: int = DRIVER_POOL_SIZE):
+        self.size = size
+        self._drivers: list = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            if self._idle.empty() and len(self._drivers) < self.size:
+                driver = await asyncio.to_thread(setup_driver)
+                self._drivers.append(driver)
+                return driver
+        return await self._idle.get()
+
+    def release(self, driver):
+        self._idle.put_nowait(driver)
+
+    async def parse(self, url: str):
+        driver = await self.acquire()
+        try:
+            return await asyncio.to_thread(parse_recipe_page, driver, url)
+        finally:
+            self.release(driver)
+
+    def close(self):
+        for driver in self._drivers:
+            driver.quit()
+        self._drivers.clear()
+
+
+def create_session(concurrency: int = CONCURRENCY) -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"},
+        timeout=aiohttp.ClientTimeout(total=30),
+    )
+
+
+async def get_recipe_links_http(fetcher: PoliteFetcher, max_links=1, base_url: str = BASE_URL):
+    html = await fetcher.fetch(base_url)
+    if not html:
+        return []
+    links = list({urljoin(base_url, link) for link in RECIPE_LINK_PATTERN.findall(html)})
+    random.shuffle(links)
+    return links[:max_links]
+
 
+async def scrape_recipe(fetcher: PoliteFetcher, drivers: DriverPool, url: str):
+    """Сначала страница разбирается по HTTP, браузер используется только если JSON-LD не нашёлся"""
+    html = await fetcher.fetch(url)
+    data = parse_recipe_html(html, url) if html else None
+    if data is None:
+        print(f"JSON-LD не найден, загрузка через браузер: {url}")
+        data = await drivers.parse(url)
+    return data
+
+
+async def save_recipes(recipes):
+	short_infos = await describe_many([json.dumps(data) for data in recipes])
+	rows = [
+		{
+			"title": data['title'],
+			"description": make_meal_details(data),
+			"cuisine": get_cuisine(data['cuisine']),
+			"giga_chat_description": short_info,
+			"cooking_time": data['timem'],
+			"image_url": data['image_url'],
+			"ingredients": data['ingredients'],
+			"source": "allrecipes",
+			"source_id": data['url'],
+		}
+		for data, short_info in zip(recipes, short_infos)
+	]
 
 	async with async_session() as db:
 		try:
-
-			await RecipeCrud.create_recipe(db=db, title=data['title'], description=info,
-			                               cuisine=data['cuisine'][0], giga_chat_description=short_info,
-			                               cooking_time=data['timem'], image_url=data['image_url'])
-
-			print(f"Успешно сохранено")
+			result = await RecipeCrud.create_recipes_bulk(db=db, recipes=rows)
+			await update_similar(db, result["inserted"])
+			print(f"Записано: {len(result['inserted'])}, без изменений: {result['unchanged']}, ошибок: {len(result['failed'])}")
 			return True
 		except Exception as e:
 			print(f"Ошибка сохранения: {str(e)}")
@@ -205,22 +368,30 @@ async def save_recipe(data):
 
 async def main():
 	n = int(input('Введите количество рецептов для парсинга: '))
-	driver = setup_driver()
+	# upsert по (source, source_id) требует колонок и уникального индекса uq_recipes_source
+	await upgrade_database()
+	drivers = DriverPool()
 	try:
-		links = get_recipe_links(driver, max_links=n)
-
-		for i, link in enumerate(links, 1):
-
-			data = parse_recipe_page(driver, link)
-			if data:
-				await save_recipe(data)
-
-			delay = random.uniform(2, 5)
-			time.sleep(delay)
+		async with create_session() as session:
+			fetcher = PoliteFetcher(session)
+			links = await get_recipe_links_http(fetcher, max_links=n)
+			if not links:
+				# Главная страница не отдала ссылки без JavaScript - собираем их браузером
+				driver = await drivers.acquire()
+				try:
+					links = await asyncio.to_thread(get_recipe_links, driver, n)
+				finally:
+					drivers.release(driver)
+
+			results = await asyncio.gather(*(scrape_recipe(fetcher, drivers, link) for link in links))
+
+		recipes = [data for data in results if data]
+		if recipes:
+			await save_recipes(recipes)
 
 	finally:
-		driver.quit()
+		drivers.close()
 
 
 if __name__ == "__main__":
-	asyncio.run(main())
\ No newline at end of file
+	asyncio.run(main())
@@ -1,9 +1,17 @@
 import aiohttp
 import asyncio
 import json
-from sberchat import get_short_description
+import logging
+import string
+from sberchat import describe_many
 from app.database.crud import RecipeCrud
-from app.database.database import get_db
+from app.database.database import async_session
+from app.database.upgrade import upgrade_database
+from app.recommendations.similar import update_similar
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://www.themealdb.com/api/json/v1/1"
 
 # Словарь с оценочным временем готовки
 COOKING_TIMES = {
@@ -13,45 +21,100 @@ COOKING_TIMES = {
     "Miscellaneous": 40
 }
 
+CONCURRENCY = 8  # одновременных запросов к API и к GigaChat
+BATCH_SIZE = 50  # рецептов в одной транзакции записи
 
-async def fetch_random_meal():
-    """Асинхронно получает случайный рецепт"""
-    url = "https://www.themealdb.com/api/json/v1/1/random.php"
-    connector = aiohttp.TCPConnector(ssl=False)  # Отключаем проверку SSL
-    async with aiohttp.ClientSession(connector=connector) as session:
-        async with session.get(url) as response:
+
+def create_session(concurrency: int = CONCURRENCY) -> aiohttp.ClientSession:
+    """Одна сессия с пулом соединений на весь импорт"""
+    connector = aiohttp.TCPConnector(ssl=False, limit=concurrency)  # Отключаем проверку SSL
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+
+
+async def fetch_json(session: aiohttp.ClientSession, path: str, api_url: str = API_URL, **params):
+    """Ответ API или None: ошибка одного запроса не должна прерывать весь импорт"""
+    try:
+        async with session.get(f"{api_url}/{path}", params=params) as response:
             if response.status == 200:
-                data = await response.json()
-                return data["meals"][0] if data["meals"] else None
-            return None
+                return await response.json(content_type=None)
+            logger.warning("TheMealDB %s %s returned %s", path, params, response.status)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        # ValueError - некорректный JSON в ответе
+        logger.warning("TheMealDB %s %s failed: %r", path, params, e)
+    return None
 
 
-async def get_meal_details():
-    """Получает детали рецепта с временем и страной кухни"""
-    meal = await fetch_random_meal()
-    if not meal:
-        return None
+async def fetch_random_meal(session: aiohttp.ClientSession, api_url: str = API_URL):
+    """Асинхронно получает случайный рецепт"""
+    data = await fetch_json(session, "random.php", api_url)
+    return data["meals"][0] if data and data["meals"] else None
+
+
+async def fetch_meals_by_letter(session: aiohttp.ClientSession, letter: str, api_url: str = API_URL):
+    """Получает полные рецепты, названия которых начинаются с буквы"""
+    data = await fetch_json(session, "search.php", api_url, f=letter)
+    return (data["meals"] or []) if data else []
+
+
+async def fetch_catalogue(session: aiohttp.ClientSession, concurrency: int = CONCURRENCY, api_url: str = API_URL):
+    """Перебирает весь каталог по буквам алфавита, рецепты без повторов по idMeal"""
+    semaphore = asyncio.Semaphore(concurrency)
 
+    async def fetch_letter(letter):
+        async with semaphore:
+            return await fetch_meals_by_letter(session, letter, api_url)
+
+    meals = {}
+    for letter_meals in await asyncio.gather(*(fetch_letter(letter) for letter in string.ascii_lowercase)):
+        for meal in letter_meals:
+            meals.setdefault(meal["idMeal"], meal)
+    return list(meals.values())
+
+
+async def fetch_random_meals(session: aiohttp.ClientSession, n: int, concurrency: int = CONCURRENCY,
+                             api_url: str = API_URL, max_attempts: int = None):
+    """Набирает n разных случайных рецептов, повторы по idMeal отбрасываются"""
+    semaphore = asyncio.Semaphore(concurrency)
+    max_attempts = max_attempts or n * 3
+
+    async def fetch_one():
+        async with semaphore:
+            return await fetch_random_meal(session, api_url)
+
+    meals = {}
+    attempts = 0
+    while len(meals) < n and attempts < max_attempts:
+        wave = min(n - len(meals), max_attempts - attempts)
+        attempts += wave
+        for meal in await asyncio.gather(*(fetch_one() for _ in range(wave))):
+            if meal:
+                meals.setdefault(meal["idMeal"], meal)
+    return list(meals.values())[:n]
+
+
+def get_meal_details(meal):
+    """Получает детали рецепта с временем и страной кухни"""
     category = meal["strCategory"]
     return {
+        "id": meal["idMeal"],
         "title": meal["strMeal"],
         "category": category,
         "cuisine": meal["strArea"],
         "image_url": meal["strMealThumb"],  # Добавляем URL изображения
         "cooking_time": COOKING_TIMES.get(category, COOKING_TIMES["Miscellaneous"]),
-        "ingredients": await extract_ingredients(meal),
+        "ingredients": extract_ingredients(meal),
         "instructions": meal["strInstructions"]
     }
 
 
-async def extract_ingredients(meal):
-    """Асинхронно извлекает ингредиенты"""
+def extract_ingredients(meal):
+    """Извлекает ингредиенты"""
     ingredients = []
     for i in range(1, 21):
         ingredient = meal.get(f"strIngredient{i}")
-        measure = meal.get(f"strMeasure{i}")
+        measure = meal.get(f"strMeasure{i}") or ""
         if ingredient and ingredient.strip():
-            ingredients.append(f"{measure.strip()} {ingredient.strip()}")
+            ingredients.append(f"{measure.strip()} {ingredient.strip()}".strip())
     return ingredients
 
 
@@ -71,29 +134,49 @@ Instructions:
     return s
 
 
-async def main():
-    n = int(input('Введите количество рецептов для парсинга: '))
-    for _ in range(n):
-        meal = await get_meal_details()
-        info = make_meal_details(meal)
+async def save_meals(meals):
+    # Краткие описания GigaChat пачкой; уже описанные рецепты берутся из кэша
+    descriptions = await describe_many([json.dumps(meal) for meal in meals])
+    recipes = [
+        {
+            "title": meal["title"],
+            "description": make_meal_details(meal),
+            "cuisine": meal["cuisine"],
+            "giga_chat_description": short_info,
+            "cooking_time": meal["cooking_time"],
+            "image_url": meal["image_url"],  # Добавляем URL изображения в базу
+            "ingredients": meal["ingredients"],
+            "source": "themealdb",
+            "source_id": meal["id"],
+        }
+        for meal, short_info in zip(meals, descriptions)
+    ]
+    async with async_session() as db:
+        result = await RecipeCrud.create_recipes_bulk(db, recipes)
+        await update_similar(db, result["inserted"])
+    print(f"Записано: {len(result['inserted'])}, без изменений: {result['unchanged']}, ошибок: {len(result['failed'])}")
+
+
+async def import_meals(raw_meals, batch_size: int = BATCH_SIZE):
+    meals = [get_meal_details(meal) for meal in raw_meals]
+    for start in range(0, len(meals), batch_size):
+        batch = meals[start:start + batch_size]
+        await save_meals(batch)
+        print(f"Обработано рецептов: {start + len(batch)} из {len(meals)}")
 
-        json_string_meal = json.dumps(meal)
-        short_info = get_short_description(json_string_meal)
 
-        async for db in get_db():
-            await RecipeCrud.create_recipe(
-                db=db,
-                title=meal['title'],
-                description=info,
-                cuisine=meal['cuisine'],
-                giga_chat_description=short_info,
-                cooking_time=meal['cooking_time'],
-                image_url=meal['image_url']  # Добавляем URL изображения в базу
-            )
-
-        print(f"Добавил рецепт '{meal['title']}' в базу (изображение: {meal['image_url']})")
+async def main():
+    n = int(input('Введите количество рецептов для парсинга (0 - весь каталог): '))
+    # upsert по (source, source_id) требует колонок и уникального индекса uq_recipes_source
+    await upgrade_database()
+    async with create_session() as session:
+        if n > 0:
+            raw_meals = await fetch_random_meals(session, n)
+        else:
+            raw_meals = await fetch_catalogue(session)
+    await import_meals(raw_meals)
 
 
 # Запуск асинхронного кода
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
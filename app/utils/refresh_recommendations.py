@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+from app.database.database import async_session
+from app.recommendations.collaborative import rebuild_recommendations, refresh_recommendations
+
+
+async def main(full: bool, interval: float | None):
+    """
+    Пересчёт рекомендаций по новым отзывам. С --interval повторяется, пока процесс не остановят;
+    --full пересчитывает всё заново (например, раз в сутки по cron)
+    """
+    while True:
+        async with async_session() as db:
+            if full:
+                users = await rebuild_recommendations(db)
+            else:
+                users = await refresh_recommendations(db)
+        print(f"Пересчитано пользователей: {users}")
+        if not interval:
+            break
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="полная пересборка вместо инкрементальной")
+    parser.add_argument("--interval", type=float, help="повторять каждые N секунд")
+    args = parser.parse_args()
+    asyncio.run(main(args.full, args.interval))
@@ -0,0 +1,39 @@
+import asyncio
+import re
+from sqlalchemy.future import select
+from sqlalchemy.orm import undefer
+from app.database.crud import RecipeCrud
+from app.database.database import async_session
+from app.database.models import Recipe
+from app.database.upgrade import upgrade_database
+
+# Блок ингредиентов в описании, которое собирают make_meal_details обоих парсеров
+INGREDIENTS_SECTION = re.compile(r"Ingredients:\n(.*?)\n\s*\nInstructions:", re.S)
+
+
+def extract_ingredients(description: str | None) -> list[str]:
+    match = INGREDIENTS_SECTION.search(description or "")
+    if not match:
+        return []
+    return [line.strip() for line in match.group(1).splitlines() if line.strip()]
+
+
+async def main():
+    """Заполняет таблицы ингредиентов для рецептов, сохранённых до их появления"""
+    # В базе, созданной до появления ингредиентов, нет ни таблиц, ни колонки ingredients_count
+    await upgrade_database()
+    async with async_session() as db:
+        result = await db.execute(
+            select(Recipe).where(Recipe.ingredients_count == 0).options(undefer(Recipe.description))
+        )
+        recipes = result.scalars().all()
+        for recipe in recipes:
+            ingredients = extract_ingredients(recipe.description)
+            if ingredients:
+                await RecipeCrud.set_recipe_ingredients(db, recipe, ingredients)
+        await db.commit()
+    print(f"Обработано рецептов: {len(recipes)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
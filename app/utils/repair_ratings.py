@@ -0,0 +1,20 @@
+import asyncio
+from app.database.crud import RecipeCrud
+from app.database.database import async_session
+from app.database.upgrade import upgrade_database
+
+
+async def main():
+    """
+    Приводит схему к моделям (ratings_sum, weighted_rating, version и их индексы, строка catalog_versions)
+    и пересчитывает агрегаты рейтингов по отзывам
+    """
+    await upgrade_database()
+
+    async with async_session() as db:
+        updated = await RecipeCrud.recalculate_ratings(db)
+    print(f"Пересчитаны рейтинги для {updated} рецептов")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,3 +1,9 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
 from gigachat import GigaChat
 from app.core.config import settings
 
@@ -5,13 +11,85 @@ promt1 = "Сделай подробное описание рецепта на 
 promt2 = "Сделай очень краткое описание рецепта на английском своими словами, верни только ответ"
 
 
+class DescriptionCache:
+    """
+    Постоянный кэш ответов GigaChat в файле SQLite.
+    Ключ - хеш промпта и нормализованного рецепта, поэтому неизменившийся рецепт повторно в модель не уходит.
+    """
+
+    def __init__(self, path: Path):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS descriptions (key TEXT PRIMARY KEY, content TEXT NOT NULL)")
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._connection.execute("SELECT content FROM descriptions WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, content: str):
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO descriptions (key, content) VALUES (?, ?)", (key, content))
+            self._connection.commit()
+
+
+description_cache = DescriptionCache(settings.GIGACHAT_CACHE_PATH)
+
+
+def cache_key(promt: str, json_string_recipe: str) -> str:
+    # Рецепт нормализуется: порядок ключей и пробелы в JSON не влияют на ключ
+    try:
+        normalized = json.dumps(json.loads(json_string_recipe), sort_keys=True, ensure_ascii=False,
+                                separators=(",", ":"))
+    except ValueError:
+        normalized = json_string_recipe.strip()
+    return hashlib.sha256(f"{promt}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+def create_client() -> GigaChat:
+    return GigaChat(credentials=settings.GIGACHAT_API_KEY, verify_ssl_certs=False, model="GigaChat")
+
+
+def ask(promt: str, json_string_recipe: str, client_factory=create_client) -> str:
+    key = cache_key(promt, json_string_recipe)
+    content = description_cache.get(key)
+    if content is None:
+        with client_factory() as giga:
+            response = giga.chat(f"{promt}: {json_string_recipe}")
+            content = response.choices[0].message.content.replace("*", "")
+        description_cache.set(key, content)
+    return content
+
+
 def get_long_description(json_string_recipe: str) -> str:
-    with GigaChat(credentials=settings.GIGACHAT_API_KEY, verify_ssl_certs=False, model="GigaChat") as giga:
-        response = giga.chat(f"{promt1}: {json_string_recipe}")
-        return response.choices[0].message.content.replace("*", "")
+    return ask(promt1, json_string_recipe)
 
 
 def get_short_description(json_string_recipe: str) -> str:
-    with GigaChat(credentials=settings.GIGACHAT_API_KEY, verify_ssl_certs=False, model="GigaChat") as giga:
-        response = giga.chat(f"{promt2}: {json_string_recipe}")
-        return response.choices[0].message.content.replace("*", "")
+    return ask(promt2, json_string_recipe)
+
+
+async def describe_many(json_string_recipes: list[str], promt: str = promt2,
+                        concurrency: int = settings.GIGACHAT_CONCURRENCY, client_factory=create_client) -> list[str]:
+    """
+    Описывает пачку рецептов: найденные в кэше берутся из него, остальные (без повторов)
+    запрашиваются у GigaChat параллельно, не больше concurrency запросов одновременно.
+    """
+    keys = [cache_key(promt, recipe) for recipe in json_string_recipes]
+    contents = {key: description_cache.get(key) for key in set(keys)}
+    missing = {key: recipe for key, recipe in zip(keys, json_string_recipes) if contents[key] is None}
+
+    if missing:
+        semaphore = asyncio.Semaphore(concurrency)
+        async with client_factory() as giga:
+            async def describe(key, recipe):
+                async with semaphore:
+                    response = await giga.achat(f"{promt}: {recipe}")
+                content = response.choices[0].message.content.replace("*", "")
+                description_cache.set(key, content)
+                contents[key] = content
+
+            await asyncio.gather(*(describe(key, recipe) for key, recipe in missing.items()))
+
+    return [contents[key] for key in keys]
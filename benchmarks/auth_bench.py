@@ -0,0 +1,28 @@
+import time
+import jwt
+from app.auth import utils as auth_utils
+from app.core.config import settings
+
+
+def bench(name: str, func, iterations: int):
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {elapsed / iterations * 1e6:10.1f} мкс/запрос")
+
+
+def main(iterations: int = 2000):
+    """Сравнивает затраты на проверку cookie-токена: PEM на каждый вызов, разобранный ключ и кэш"""
+    token = auth_utils.encode_jwt({"sub": "1", "username": "bench"})
+    public_pem = settings.auth_jwt.public_key_path.read_text()
+    algorithm = settings.auth_jwt.algorithm
+
+    bench("PEM на каждый запрос (было)", lambda: jwt.decode(token, public_pem, algorithms=[algorithm]), iterations)
+    bench("разобранный ключ", lambda: auth_utils.decode_jwt(token), iterations)
+    bench("кэш проверенных токенов", lambda: auth_utils.decode_jwt_cached(token), iterations)
+
+
+if __name__ == "__main__":
+    main()
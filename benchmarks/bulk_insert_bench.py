@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.database.crud import RecipeCrud
+from app.database.database import Base
+
+
+def make_recipes(n: int, offset: int = 0):
+    for i in range(offset, offset + n):
+        yield {
+            "title": f"Bench recipe {i}",
+            "description": "Ingredients:\n" + "\n".join(f"{k} cup ingredient {k}" for k in range(10)),
+            "cuisine": "Italian",
+            "giga_chat_description": "Short description",
+            "cooking_time": 30,
+            "image_url": None,
+            "ingredients": [f"{k} cup ingredient{chr(97 + k)}" for k in range(10)],
+        }
+
+
+async def main(database_url: str, rows: int, batch_size: int, use_copy: bool):
+    """Скорость вставки рецептов: по одному через create_recipe и пачками через create_recipes_bulk"""
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_factory() as db:
+        start = time.perf_counter()
+        for data in make_recipes(rows):
+            await RecipeCrud.create_recipe(db, **data)
+        single = rows / (time.perf_counter() - start)
+
+    async with session_factory() as db:
+        start = time.perf_counter()
+        result = await RecipeCrud.create_recipes_bulk(db, make_recipes(rows, offset=rows), batch_size=batch_size,
+                                                      use_copy=use_copy)
+        bulk = len(result["inserted"]) / (time.perf_counter() - start)
+
+    await engine.dispose()
+    print(f"create_recipe:       {single:10.0f} строк/с")
+    print(f"create_recipes_bulk: {bulk:10.0f} строк/с ({bulk / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///" + os.path.join(tempfile.gettempdir(), "bulk_bench.db"),
+                        help="отдельная база для замеров, таблицы в ней пересоздаются")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--copy", action="store_true", help="COPY вместо INSERT на PostgreSQL")
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.rows, args.batch_size, args.copy))
@@ -0,0 +1,39 @@
+import argparse
+import time
+from fastapi.testclient import TestClient
+from app.auth import utils as auth_utils
+from app.main import app
+
+
+def bench(client: TestClient, name: str, url: str, headers: dict, iterations: int):
+    response = client.get(url, headers=headers)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        response = client.get(url, headers=headers)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {response.status_code:>4} {response.num_bytes_downloaded:>10} байт "
+          f"{elapsed / iterations * 1e3:10.2f} мс/запрос")
+
+
+def main():
+    """
+    Сравнивает повторную загрузку списков и рецепта: полный ответ, сжатый ответ и 304 по ETag.
+    Запускается на заполненной базе из DATABASE_URL.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--recipe-id", type=int, default=1)
+    args = parser.parse_args()
+
+    token = auth_utils.encode_jwt({"sub": "1", "username": "bench"})
+    with TestClient(app, cookies={"access_token": token}) as client:
+        for url in ("/api/recipes?limit=200", "/api/recipes/popular", f"/api/recipe/{args.recipe_id}"):
+            print(url)
+            etag = client.get(url).headers.get("etag", "")
+            bench(client, "без сжатия", url, {"Accept-Encoding": "identity"}, args.iterations)
+            bench(client, "gzip/br", url, {"Accept-Encoding": "br, gzip"}, args.iterations)
+            bench(client, "If-None-Match (304)", url, {"If-None-Match": etag}, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import random
+import time
+import httpx
+from benchmarks.report import LoadReport
+from benchmarks.seed import CUISINES, PASSWORD, make_username
+
+# Доли запросов в смеси: в основном просмотр каталога, немного отзывов и входов
+MIX = {
+    "GET /api/recipes": 25,
+    "GET /api/recipes/filter/": 20,
+    "GET /api/recipe/{id}": 25,
+    "GET /api/reviews/{id}": 15,
+    "POST /api/addreview": 10,
+    "POST /login": 5,
+}
+SORTS = ["id", "cooking_time", "rating", "popularity"]
+
+
+def make_request(endpoint: str, rng: random.Random, args) -> tuple[str, str, dict]:
+    recipe_id = rng.randint(1, args.recipes)
+    if endpoint == "GET /api/recipes":
+        return "GET", "/api/recipes", {"params": {"limit": 50, "sort": rng.choice(SORTS)}}
+    if endpoint == "GET /api/recipes/filter/":
+        params = {"cuisine": rng.sample(list(CUISINES), rng.randint(1, 2)), "sort": rng.choice(SORTS), "limit": 50}
+        if rng.random() < 0.5:
+            params["max_cooking_time"] = rng.choice([20, 30, 45, 60])
+        return "GET", "/api/recipes/filter/", {"params": params}
+    if endpoint == "GET /api/recipe/{id}":
+        return "GET", f"/api/recipe/{recipe_id}", {}
+    if endpoint == "GET /api/reviews/{id}":
+        return "GET", f"/api/reviews/{recipe_id}", {}
+    if endpoint == "POST /api/addreview":
+        return "POST", "/api/addreview", {"params": {"recipe_id": recipe_id},
+                                          "json": {"rating": rng.randint(1, 5), "text": "load test"}}
+    if endpoint == "POST /login":
+        return "POST", "/login", {"json": {"username": make_username(rng.randrange(args.users)), "password": PASSWORD}}
+    raise ValueError(endpoint)
+
+
+async def timed_request(client: httpx.AsyncClient, report: LoadReport, endpoint: str, method: str, url: str,
+                        **kwargs) -> httpx.Response | None:
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        report.record_error(endpoint)
+        return None
+    report.record(endpoint, response.status_code, time.perf_counter() - start)
+    return response
+
+
+async def virtual_user(number: int, args, transport, report: LoadReport, deadline: float):
+    """Один пользователь: входит и отправляет запросы из смеси, пока не выйдет время"""
+    rng = random.Random(args.seed + number)
+    endpoints, weights = list(MIX), list(MIX.values())
+    async with httpx.AsyncClient(base_url=args.base_url, transport=transport, timeout=args.timeout) as client:
+        method, url, kwargs = make_request("POST /login", rng, args)
+        response = await timed_request(client, report, "POST /login", method, url, **kwargs)
+        if response is None or response.status_code != 200:
+            return
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            method, url, kwargs = make_request(endpoint, rng, args)
+            await timed_request(client, report, endpoint, method, url, **kwargs)
+
+
+async def run(args) -> LoadReport:
+    report = LoadReport()
+    transport = None
+    if args.base_url == "asgi":
+        # Без сервера: запросы идут прямо в приложение, удобно для сравнения веток на одной машине
+        from app.main import app
+        transport = httpx.ASGITransport(app=app)
+        args.base_url = "http://asgi"
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(virtual_user(number, args, transport, report, deadline)
+                           for number in range(args.concurrency)))
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main():
+    """
+    Нагрузочный прогон по базе, заполненной benchmarks.seed с теми же --users и --recipes.
+    Сервер запускается отдельно (uvicorn app.main:app) или используется --base-url asgi
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="адрес сервера или asgi")
+    parser.add_argument("--concurrency", type=int, default=20, help="одновременных пользователей")
+    parser.add_argument("--duration", type=float, default=30.0, help="длительность прогона, секунд")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--recipes", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", help="сохранить отчёт в JSON для сравнения веток")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(report.format())
+    if args.json:
+        report.save(args.json)
+
+
+if __name__ == "__main__":
+    main()
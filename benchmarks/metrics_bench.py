@@ -0,0 +1,51 @@
+import asyncio
+import time
+from app.core.metrics import MetricsMiddleware, MetricsRegistry
+
+
+class Route:
+    path = "/api/recipe/{recipe_id}"
+
+
+ROUTE = Route()
+
+
+async def endpoint(scope, receive, send):
+    # Минимальное приложение: как роутер FastAPI, записывает маршрут в scope и отвечает 200
+    scope["route"] = ROUTE
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def bench(name: str, app, iterations: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/recipe/1"}
+    await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    per_request = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{name:<24} {per_request:8.2f} мкс/запрос")
+    return per_request
+
+
+async def main(iterations: int = 200000):
+    """Накладные расходы MetricsMiddleware на запрос без учёта работы эндпоинта"""
+    registry = MetricsRegistry()
+    bare = await bench("без метрик", endpoint, iterations)
+    measured = await bench("MetricsMiddleware", MetricsMiddleware(endpoint, registry), iterations)
+    print(f"накладные расходы: {measured - bare:.2f} мкс/запрос")
+    start = time.perf_counter()
+    registry.render()
+    print(f"выгрузка /metrics: {(time.perf_counter() - start) * 1e3:.2f} мс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+import json
+import math
+from collections import defaultdict
+
+
+class LoadReport:
+    """Задержки и коды ответов по эндпоинтам за прогон нагрузки"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: dict[str, int] = defaultdict(int)
+        self.elapsed = 0.0
+
+    def record(self, endpoint: str, status_code: int, latency: float):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][status_code] += 1
+
+    def record_error(self, endpoint: str):
+        # Ошибка соединения или таймаут: ответа нет, в задержки не попадает
+        self.errors[endpoint] += 1
+
+    def summary(self) -> dict:
+        result = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies.get(endpoint, []))
+            statuses = self.statuses.get(endpoint, {})
+            result[endpoint] = {
+                "requests": len(latencies),
+                "throughput_rps": len(latencies) / self.elapsed if self.elapsed else 0.0,
+                "p50_ms": percentile(latencies, 50) * 1e3,
+                "p95_ms": percentile(latencies, 95) * 1e3,
+                "p99_ms": percentile(latencies, 99) * 1e3,
+                "max_ms": latencies[-1] * 1e3 if latencies else 0.0,
+                "statuses": dict(sorted(statuses.items())),
+                "errors": self.errors.get(endpoint, 0),
+            }
+        return result
+
+    def format(self) -> str:
+        summary = self.summary()
+        lines = [f"{'эндпоинт':<24} {'запросов':>9} {'rps':>8} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8} "
+                 f"{'max мс':>8}  коды"]
+        total = 0
+        for endpoint, row in summary.items():
+            total += row["requests"]
+            codes = " ".join(f"{code}:{count}" for code, count in row["statuses"].items())
+            if row["errors"]:
+                codes += f" ошибки:{row['errors']}"
+            lines.append(f"{endpoint:<24} {row['requests']:>9} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} "
+                         f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}  {codes}")
+        lines.append(f"всего {total} запросов за {self.elapsed:.1f} с, "
+                     f"{total / self.elapsed if self.elapsed else 0.0:.1f} запросов/с")
+        return "\n".join(lines)
+
+    def save(self, path: str):
+        # JSON-отчёты разных веток удобно сравнивать между собой
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"elapsed_seconds": self.elapsed, "endpoints": self.summary()}, file, indent=2)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Перцентиль по методу ближайшего ранга, values отсортированы"""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(values)), 1)
+    return values[rank - 1]
@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import math
+import random
+import time
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.auth import utils as auth_utils
+from app.core.config import settings
+from app.database.crud import RecipeCrud
+from app.database.database import Base
+from app.database.models import User, Review
+
+# Пароль всех сгенерированных пользователей, его использует load.py
+PASSWORD = "benchpass1"
+
+# Доли кухонь примерно как в TheMealDB и AllRecipes
+CUISINES = {
+    "American": 18, "Italian": 14, "Mexican": 9, "Indian": 8, "Chinese": 8, "French": 7, "British": 6,
+    "Japanese": 5, "Thai": 5, "Greek": 4, "Spanish": 4, "Moroccan": 3, "Vietnamese": 3, "Russian": 3,
+    "Turkish": 2, "Jamaican": 1,
+}
+ADJECTIVES = ["Classic", "Spicy", "Creamy", "Easy", "Grilled", "Roasted", "Slow Cooker", "Crispy", "Garlic",
+              "Lemon", "Smoky", "Honey", "Rustic", "Quick", "Homemade", "Baked"]
+MAINS = ["Chicken", "Beef", "Pork", "Salmon", "Shrimp", "Tofu", "Lamb", "Mushroom", "Lentil", "Potato",
+         "Eggplant", "Chickpea", "Turkey", "Cod", "Spinach", "Pumpkin"]
+DISHES = ["Stew", "Curry", "Soup", "Salad", "Pie", "Tacos", "Pasta", "Risotto", "Casserole", "Stir Fry",
+          "Skewers", "Burger", "Noodles", "Bake", "Wraps", "Chili"]
+INGREDIENTS = [
+    "onion", "garlic clove", "carrot", "celery stalk", "tomato", "potato", "bell pepper", "chili pepper",
+    "ginger", "lemon", "lime", "olive oil", "butter", "vegetable oil", "flour", "sugar", "brown sugar", "salt",
+    "black pepper", "paprika", "cumin", "coriander", "turmeric", "cinnamon", "oregano", "basil", "thyme",
+    "rosemary", "parsley", "cilantro", "soy sauce", "fish sauce", "rice vinegar", "white wine", "chicken stock",
+    "beef stock", "coconut milk", "heavy cream", "milk", "egg", "parmesan", "cheddar", "mozzarella", "rice",
+    "spaghetti", "noodles", "bread crumbs", "chickpeas", "lentils", "spinach", "mushroom", "zucchini",
+    "eggplant", "honey", "mustard", "tomato paste", "sesame oil", "green onion", "yogurt", "chicken breast",
+]
+QUANTITIES = ["1 cup", "2 cups", "1/2 cup", "1 tbsp", "2 tbsp", "1 tsp", "1/2 tsp", "200 g", "500 g", "1",
+              "2", "3", "1 pinch", "1 can"]
+STEPS = [
+    "Heat the oil in a large pan over medium heat.", "Add the onion and cook until soft and translucent.",
+    "Stir in the garlic and spices and cook for another minute until fragrant.",
+    "Add the main ingredient and brown it on all sides.", "Pour in the stock and bring to a gentle simmer.",
+    "Cover and cook, stirring occasionally, until everything is tender.",
+    "Season to taste with salt and pepper.", "Meanwhile, cook the rice or pasta according to the packet.",
+    "Preheat the oven and grease a baking dish.", "Transfer to the dish and bake until golden on top.",
+    "Whisk the sauce ingredients together in a small bowl.", "Let it rest for a few minutes before serving.",
+    "Garnish with fresh herbs and serve warm.", "Leftovers keep in the fridge for up to three days.",
+]
+
+
+def make_username(i: int) -> str:
+    # UserCreate требует от 3 до 10 символов
+    return f"user{i}"
+
+
+def make_recipe(rng: random.Random, i: int) -> dict:
+    cuisine = rng.choices(list(CUISINES), weights=list(CUISINES.values()))[0]
+    title = f"{rng.choice(ADJECTIVES)} {rng.choice(MAINS)} {rng.choice(DISHES)} #{i}"
+    ingredients = [f"{rng.choice(QUANTITIES)} {name}" for name in rng.sample(INGREDIENTS, rng.randint(6, 14))]
+    steps = [rng.choice(STEPS) for _ in range(rng.randint(8, 20))]
+    # Время готовки распределено логнормально: медиана около 35 минут, длинный хвост тушёных блюд
+    cooking_time = min(max(int(rng.lognormvariate(math.log(35), 0.6)), 5), 480)
+    description = (
+        f"Recipe: {title}\nCategory: Main\nCuisine: {cuisine}\n\n"
+        "Ingredients:\n" + "\n".join(ingredients) + "\n\n"
+        "Instructions:\n" + "\n".join(f"{n}. {step}" for n, step in enumerate(steps, 1))
+    )
+    return {
+        "title": title,
+        "description": description,
+        "cuisine": cuisine,
+        "giga_chat_description": " ".join(rng.sample(STEPS, 3)),
+        "cooking_time": cooking_time,
+        "image_url": f"https://example.com/images/{i}.jpg",
+        "ingredients": ingredients,
+    }
+
+
+async def seed(database_url: str, users: int, recipes: int, reviews: int, seed_value: int, batch_size: int = 1000):
+    """Пересоздаёт таблицы и заполняет их; при одном seed данные совпадают, чтобы сравнивать ветки"""
+    rng = random.Random(seed_value)
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_factory() as db:
+        start = time.perf_counter()
+        # bcrypt считается один раз: у всех пользователей один пароль
+        hashed_password = auth_utils.hash_password(PASSWORD)
+        for first in range(0, users, batch_size):
+            rows = [{"username": make_username(i), "hashed_password": hashed_password}
+                    for i in range(first, min(first + batch_size, users))]
+            await db.execute(insert(User), rows)
+        await db.commit()
+        print(f"пользователи: {users} за {time.perf_counter() - start:.1f} с")
+
+        start = time.perf_counter()
+        result = await RecipeCrud.create_recipes_bulk(db, (make_recipe(rng, i) for i in range(recipes)),
+                                                      batch_size=batch_size)
+        recipe_ids = result["inserted"]
+        print(f"рецепты: {len(recipe_ids)} за {time.perf_counter() - start:.1f} с")
+
+        start = time.perf_counter()
+        user_ids = list(range(1, users + 1))
+        # Популярность рецептов по закону Ципфа: немногие рецепты собирают большую часть отзывов
+        popularity = [1 / (rank ** 1.1) for rank in range(1, len(recipe_ids) + 1)]
+        shuffled_ids = rng.sample(recipe_ids, len(recipe_ids))
+        quality = {recipe_id: rng.uniform(2.5, 4.8) for recipe_id in recipe_ids}
+        for first in range(0, reviews, batch_size):
+            count = min(batch_size, reviews - first)
+            rows = []
+            for recipe_id in rng.choices(shuffled_ids, weights=popularity, k=count):
+                rating = min(max(round(rng.gauss(quality[recipe_id], 1.0)), 1), 5)
+                rows.append({"recipe_id": recipe_id, "user_id": rng.choice(user_ids), "rating": rating,
+                             "text": rng.choice(STEPS)})
+            await db.execute(insert(Review), rows)
+        await db.commit()
+        await RecipeCrud.recalculate_ratings(db)
+        print(f"отзывы: {reviews} за {time.perf_counter() - start:.1f} с")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Заполняет базу синтетическими пользователями, рецептами и отзывами")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--recipes", type=int, default=10000)
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42, help="одинаковый seed даёт одинаковые данные")
+    parser.add_argument("--reset", action="store_true", help="подтверждение: все таблицы базы будут пересозданы")
+    args = parser.parse_args()
+    if not args.reset:
+        parser.error("seed пересоздаёт таблицы, подтвердите флагом --reset")
+    if not args.users or not args.recipes:
+        parser.error("нужен хотя бы один пользователь и один рецепт")
+    asyncio.run(seed(args.database_url, args.users, args.recipes, args.reviews, args.seed))
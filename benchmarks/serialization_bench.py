@@ -0,0 +1,43 @@
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.schemas import RecipeSummary, RecipePage
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {"id": i, "title": f"Recipe {i}", "cuisine": "Italian", "average_rating": 4.25, "ratings_count": i % 50,
+         "cooking_time": 30, "image_url": f"https://example.com/{i}.jpg"}
+        for i in range(count)
+    ]
+
+
+def bench(name: str, func, iterations: int):
+    body = func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {elapsed / iterations * 1e3:8.2f} мс/страница")
+    return body
+
+
+def main(count: int = 200, iterations: int = 200):
+    """Сравнивает сериализацию страницы списка: через response_model (было) и ORJSONResponse из строк"""
+    rows = make_rows(count)
+
+    def pydantic_path():
+        # То же, что делает FastAPI с response_model: валидация каждой строки и jsonable_encoder
+        page = RecipePage(items=[RecipeSummary.model_validate(row) for row in rows], next_cursor=None)
+        return JSONResponse(jsonable_encoder(RecipePage.model_validate(page))).body
+
+    def orjson_path():
+        return ORJSONResponse({"items": rows, "next_cursor": None}).body
+
+    before = bench("response_model + JSONResponse", pydantic_path, iterations)
+    after = bench("ORJSONResponse из строк", orjson_path, iterations)
+    print("вывод совпадает:", before == after)
+
+
+if __name__ == "__main__":
+    main()
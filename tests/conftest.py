@@ -0,0 +1,79 @@
+import os
+import tempfile
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def write_test_jwt_keys(directory: str) -> tuple[str, str]:
+    # Ключи из app/certs не хранятся в git, тестам хватает временной пары
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_path, public_path = os.path.join(directory, "jwt-private.pem"), os.path.join(directory, "jwt-public.pem")
+    with open(private_path, "wb") as file:
+        file.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                     serialization.NoEncryption()))
+    with open(public_path, "wb") as file:
+        file.write(key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                 serialization.PublicFormat.SubjectPublicKeyInfo))
+    return private_path, public_path
+
+
+# Настройки приложения читаются при импорте; тестам не нужны ни реальная БД, ни ключ GigaChat,
+# а кэш описаний не должен попадать в рабочий каталог
+TEST_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("GIGACHAT_API_KEY", "test")
+os.environ.setdefault("GIGACHAT_CACHE_PATH", os.path.join(TEST_DIR, "gigachat_cache.sqlite3"))
+if "auth_jwt__private_key_path" not in os.environ:
+    os.environ["auth_jwt__private_key_path"], os.environ["auth_jwt__public_key_path"] = write_test_jwt_keys(TEST_DIR)
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database.crud import RecipeCrud  # noqa: F401 - регистрирует DDL полнотекстового поиска
+from app.database.database import Base
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def engine():
+    # Одна база SQLite в памяти на тест: StaticPool отдаёт всем одно соединение
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(engine):
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+async def app_client(engine):
+    """Клиент приложения на тестовой базе от имени пользователя 1"""
+    import httpx
+    from app.core.cache import recipe_cache
+    from app.database.database import get_db, get_read_db
+    from app.main import app, get_current_user
+
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def get_test_db():
+        async with session_factory() as session:
+            yield session
+
+    recipe_cache.clear()
+    app.dependency_overrides.update({get_db: get_test_db, get_read_db: get_test_db,
+                                     get_current_user: lambda: {"sub": "1"}})
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+    recipe_cache.clear()
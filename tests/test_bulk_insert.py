@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import func
+from sqlalchemy.future import select
+from app.database.crud import RecipeCrud, copy_records
+from app.database.models import Recipe, RecipeIngredient
+
+pytestmark = pytest.mark.anyio
+
+
+def make_recipe(number: int, **fields) -> dict:
+    recipe = {"title": f"Recipe {number}", "description": "", "cuisine": "Italian", "giga_chat_description": "",
+              "cooking_time": 30, "ingredients": ["tomato", f"spice {number}"]}
+    recipe.update(fields)
+    return recipe
+
+
+async def count(db, model) -> int:
+    return (await db.execute(select(func.count()).select_from(model))).scalar()
+
+
+async def test_batches_are_committed_separately(db):
+    async def recipes():
+        for number in range(5):
+            yield make_recipe(number)
+
+    result = await RecipeCrud.create_recipes_bulk(db, recipes(), batch_size=2)
+    assert result == {"inserted": [1, 2, 3, 4, 5], "unchanged": 0, "failed": []}
+    # Каталог версионируется один раз на пачку: 2 + 2 + 1
+    assert await RecipeCrud.get_catalog_version(db) == 3
+    assert await count(db, RecipeIngredient) == 10
+
+
+async def test_failed_batch_falls_back_to_row_by_row(db):
+    recipes = [make_recipe(0), make_recipe(1), make_recipe(2, title=None), make_recipe(3)]
+    result = await RecipeCrud.create_recipes_bulk(db, recipes, batch_size=2)
+
+    assert len(result["inserted"]) == 3 and result["unchanged"] == 0
+    assert [failure["title"] for failure in result["failed"]] == [None]
+    titles = (await db.execute(select(Recipe.title).order_by(Recipe.id))).scalars().all()
+    assert titles == ["Recipe 0", "Recipe 1", "Recipe 3"]
+    # Ингредиенты упавшей строки не остались висеть после отката
+    assert await count(db, RecipeIngredient) == 6
+
+
+async def test_upsert_accounting(db):
+    sourced = [make_recipe(number, source="themealdb", source_id=number) for number in range(3)]
+    first = await RecipeCrud.create_recipes_bulk(db, sourced)
+    assert len(first["inserted"]) == 3 and first["unchanged"] == 0
+
+    # Повтор в одной пачке схлопывается в последнюю версию; неизменённые считаются в unchanged
+    changed = dict(sourced[1], cooking_time=45)
+    second = await RecipeCrud.create_recipes_bulk(db, sourced + [changed, make_recipe(9)])
+    assert second["unchanged"] == 2 and not second["failed"]
+    assert len(second["inserted"]) == 2 and first["inserted"][1] in second["inserted"]
+    assert await count(db, Recipe) == 4
+    cooking_time = await db.execute(select(Recipe.cooking_time).where(Recipe.id == first["inserted"][1]))
+    assert cooking_time.scalar() == 45
+
+
+def test_copy_records_follow_column_names():
+    rows = [{"title": "A", "cuisine": "Italian"}, {"cuisine": "French", "title": "B"}]
+    columns, records = copy_records([10, 11], rows)
+    assert columns == ["id", "title", "cuisine"]
+    assert records == [(10, "A", "Italian"), (11, "B", "French")]
+
+
+def test_copy_records_reject_different_columns():
+    with pytest.raises(ValueError):
+        copy_records([10, 11], [{"title": "A"}, {"title": "B", "image_url": None}])
@@ -0,0 +1,167 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import update
+from app.core import cache as cache_module
+from app.core.cache import AsyncTTLCache, recipe_cache
+from app.database.crud import CachedRecipeCrud, RecipeCrud
+from app.database.models import Recipe
+
+pytestmark = pytest.mark.anyio
+
+
+class Loader:
+    """Загрузчик, который держит вызовы до release и считает их"""
+
+    def __init__(self, value="value"):
+        self.value = value
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.released = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.released.wait()
+        return self.value
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    loader = Loader()
+    tasks = [asyncio.create_task(cache.get_or_load("key", loader)) for _ in range(10)]
+    await loader.started.wait()
+    loader.released.set()
+    assert await asyncio.gather(*tasks) == ["value"] * 10
+    assert loader.calls == 1
+    assert await cache.get_or_load("key", loader) == "value"
+    assert (cache.hits, cache.misses, loader.calls) == (1, 10, 1)
+
+
+async def test_cancelled_leader_does_not_cancel_followers():
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    loader = Loader()
+    leader = asyncio.create_task(cache.get_or_load("key", loader))
+    await loader.started.wait()
+    followers = [asyncio.create_task(cache.get_or_load("key", loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    await asyncio.sleep(0)
+    # Один из ожидающих стал новым загрузчиком, остальные ждут его
+    assert loader.calls == 2
+    loader.released.set()
+    assert await asyncio.gather(*followers) == ["value"] * 3
+    assert loader.calls == 2
+
+
+async def test_loader_error_reaches_followers_and_is_not_cached():
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise RuntimeError("boom")
+
+    tasks = [asyncio.create_task(cache.get_or_load("key", failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.stats()["size"] == 0
+
+
+async def test_entries_expire_after_ttl(clock):
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(clock.value)
+        return len(calls)
+
+    assert await cache.get_or_load("key", loader) == 1
+    clock.value += 59
+    assert await cache.get_or_load("key", loader) == 1
+    clock.value += 2
+    assert await cache.get_or_load("key", loader) == 2
+
+
+async def test_least_recently_used_entry_is_evicted():
+    cache = AsyncTTLCache(maxsize=2, ttl=60)
+
+    async def load(key):
+        return await cache.get_or_load(key, lambda: asyncio.sleep(0, result=key))
+
+    await load("a")
+    await load("b")
+    await load("a")  # "b" становится самой старой записью
+    await load("c")
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+
+async def test_invalidate_tag_drops_only_tagged_entries():
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    await cache.get_or_load("recipe", lambda: asyncio.sleep(0, result=1), tags=["recipe:1"])
+    await cache.get_or_load("list", lambda: asyncio.sleep(0, result=[1, 2]), tags=lambda value: ["recipes"])
+    cache.invalidate_tag("recipe:1")
+    assert list(cache._entries) == ["list"]
+    assert cache._tags == {"recipes": {"list"}}
+
+
+async def test_invalidation_during_load_is_not_stored():
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    loader = Loader()
+    task = asyncio.create_task(cache.get_or_load("key", loader, tags=["recipes"]))
+    await loader.started.wait()
+    cache.invalidate_tag("recipes")
+    cache.invalidate("key")
+    loader.released.set()
+    assert await task == "value"
+    assert cache.stats()["size"] == 0
+
+
+@pytest.fixture
+def empty_recipe_cache():
+    recipe_cache.clear()
+    yield recipe_cache
+    recipe_cache.clear()
+
+
+async def rename_without_invalidation(db, title):
+    # Запись из другого процесса (парсера): локальный кэш о ней не знает
+    await db.execute(update(Recipe).where(Recipe.id == 1).values(title=title))
+    await db.commit()
+
+
+async def test_cached_recipe_is_keyed_by_version(db, empty_recipe_cache):
+    await RecipeCrud.create_recipes_bulk(db, [{"title": "Soup", "description": "", "cuisine": "Russian",
+                                               "giga_chat_description": "", "cooking_time": 30}])
+    assert (await CachedRecipeCrud.get_recipe(db, 1, version=1)).title == "Soup"
+    await rename_without_invalidation(db, "Borscht")
+    assert (await CachedRecipeCrud.get_recipe(db, 1, version=1)).title == "Soup"
+    assert (await CachedRecipeCrud.get_recipe(db, 1, version=2)).title == "Borscht"
+
+
+async def test_cached_lists_are_keyed_by_catalog_version(db, empty_recipe_cache):
+    await RecipeCrud.create_recipes_bulk(db, [{"title": "Soup", "description": "", "cuisine": "Russian",
+                                               "giga_chat_description": "", "cooking_time": 30}])
+    page, _ = await CachedRecipeCrud.get_recipes_by_filters(db, version=1, cuisines=["Russian"])
+    popular = await CachedRecipeCrud.get_popular_recipes(db, version=1)
+    assert page[0]["title"] == popular[0]["title"] == "Soup"
+
+    await rename_without_invalidation(db, "Borscht")
+    page, _ = await CachedRecipeCrud.get_recipes_by_filters(db, version=1, cuisines=["Russian"])
+    assert page[0]["title"] == "Soup"
+    page, _ = await CachedRecipeCrud.get_recipes_by_filters(db, version=2, cuisines=["Russian"])
+    popular = await CachedRecipeCrud.get_popular_recipes(db, version=2)
+    assert page[0]["title"] == popular[0]["title"] == "Borscht"
@@ -0,0 +1,29 @@
+import pytest
+from app.database.crud import RecipeCrud, encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+# Корректно закодированные курсоры неподходящей формы
+WRONG_SHAPE_CURSORS = [encode_cursor([]), encode_cursor([1, 2]), encode_cursor(["1"]), encode_cursor([-1])]
+
+
+@pytest.mark.parametrize("cursor", WRONG_SHAPE_CURSORS + ["not-a-cursor"])
+async def test_search_rejects_malformed_cursor(db, cursor):
+    with pytest.raises(ValueError, match="^Invalid cursor$"):
+        await RecipeCrud.search_recipes(db, "soup", cursor=cursor)
+
+
+async def test_search_accepts_own_cursor(db):
+    recipes, next_cursor = await RecipeCrud.search_recipes(db, "soup", cursor=encode_cursor([20]))
+    assert recipes == [] and next_cursor is None
+
+
+@pytest.mark.parametrize("cursor", WRONG_SHAPE_CURSORS[:3] + ["not-a-cursor"])
+async def test_reviews_reject_malformed_cursor(db, cursor):
+    with pytest.raises(ValueError, match="^Invalid cursor$"):
+        await RecipeCrud.get_reviews_for_recipe(db, 1, cursor=cursor)
+
+
+async def test_reviews_accept_own_cursor(db):
+    reviews, next_cursor = await RecipeCrud.get_reviews_for_recipe(db, 1, cursor=encode_cursor([10]))
+    assert reviews == [] and next_cursor is None
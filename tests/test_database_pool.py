@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.database.database import InstrumentedQueuePool, pool_status
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def pooled_engine(tmp_path):
+    # create_engine не ставит пул с очередью для SQLite, поэтому пул задаётся явно
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                                 pool_size=2, max_overflow=3)
+    yield engine
+    await engine.dispose()
+
+
+async def test_pool_status_reports_capacity_and_checkouts(pooled_engine):
+    async with pooled_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        status = pool_status(pooled_engine)
+        assert status["size"] == 2 and status["max_overflow"] == 3
+        assert status["checked_out"] == 1
+        assert status["saturation"] == pytest.approx(1 / 5)
+    assert pool_status(pooled_engine)["checkouts"] == 1
+
+
+async def test_pool_status_survives_dispose(pooled_engine):
+    async with pooled_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    await pooled_engine.dispose()
+    status = pool_status(pooled_engine)
+    assert status["max_overflow"] == 3 and status["checked_out"] == 0
+    assert status["checkouts"] == 1
@@ -0,0 +1,62 @@
+import pytest
+from app.database.crud import RecipeCrud
+
+pytestmark = pytest.mark.anyio
+
+SOUP = {"title": "Soup", "description": "", "cuisine": "Russian", "giga_chat_description": "", "cooking_time": 30,
+        "source": "themealdb", "source_id": 1}
+ENDPOINTS = ["/api/recipes", "/api/recipes/popular", "/api/recipe/1"]
+
+
+@pytest.fixture
+async def client(app_client, db):
+    await RecipeCrud.create_recipes_bulk(db, [SOUP, dict(SOUP, title="Stew", source_id=2)])
+    return app_client
+
+
+async def get_etags(client) -> dict[str, str]:
+    etags = {}
+    for url in ENDPOINTS:
+        response = await client.get(url)
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-cache"
+        etags[url] = response.headers["etag"]
+    return etags
+
+
+@pytest.mark.parametrize("url", ENDPOINTS)
+async def test_matching_etag_returns_304_without_body(client, url):
+    etag = (await client.get(url)).headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}'):
+        response = await client.get(url, headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    assert (await client.get(url, headers={"If-None-Match": '"other"'})).status_code == 200
+
+
+async def test_review_changes_etags(client):
+    before = await get_etags(client)
+    response = await client.post("/api/addreview", params={"recipe_id": 1}, json={"rating": 5, "text": "ok"})
+    assert response.status_code == 200
+
+    after = await get_etags(client)
+    assert all(after[url] != before[url] for url in ENDPOINTS)
+    for url in ENDPOINTS:
+        response = await client.get(url, headers={"If-None-Match": before[url]})
+        assert response.status_code == 200 and response.content
+    # Отзыв виден в свежем ответе, а не в закэшированном под старой версией
+    assert (await client.get("/api/recipe/1")).json()["ratings_count"] == 1
+
+
+async def test_upsert_changes_etags(client, db):
+    before = await get_etags(client)
+    unchanged = await RecipeCrud.create_recipes_bulk(db, [SOUP])
+    assert unchanged["unchanged"] == 1
+    assert await get_etags(client) == before
+
+    await RecipeCrud.create_recipes_bulk(db, [dict(SOUP, title="Borscht")])
+    after = await get_etags(client)
+    assert all(after[url] != before[url] for url in ENDPOINTS)
+    assert (await client.get("/api/recipe/1")).json()["title"] == "Borscht"
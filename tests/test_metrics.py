@@ -0,0 +1,100 @@
+import asyncio
+import re
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from starlette.responses import Response
+from app.core.metrics import UNMATCHED_ROUTE, MetricsMiddleware, MetricsRegistry
+
+pytestmark = pytest.mark.anyio
+
+# Строка образца в текстовом формате Prometheus: имя, необязательные метки и число
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\.)*"'
+                    r'(,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\.)*")*\})? [-+0-9.eEInf]+$')
+
+
+async def static_app(scope, receive, send):
+    await Response(b"body { }", media_type="text/css")(scope, receive, send)
+
+
+@pytest.fixture
+def app_and_registry():
+    registry = MetricsRegistry()
+    app = FastAPI()
+    app.state.release = asyncio.Event()
+    app.state.started = asyncio.Event()
+
+    @app.get("/api/recipe/{recipe_id}")
+    async def get_recipe(recipe_id: int):
+        return {"id": recipe_id}
+
+    @app.get("/api/slow/{n}")
+    async def slow(n: int):
+        app.state.started.set()
+        await app.state.release.wait()
+        return {"n": n}
+
+    @app.get("/metrics")
+    async def get_metrics():
+        return PlainTextResponse(registry.render())
+
+    app.mount("/static", static_app)
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    return app, registry
+
+
+@pytest.fixture
+async def client(app_and_registry):
+    app, _ = app_and_registry
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def samples(text: str, name: str) -> dict[str, float]:
+    return {line.split(" ")[0]: float(line.split(" ")[1]) for line in text.splitlines()
+            if line.startswith(name + "{") or line.startswith(name + " ")}
+
+
+async def test_exposition_format(client):
+    await client.get("/api/recipe/1")
+    text = (await client.get("/metrics")).text
+    assert text.endswith("\n")
+    declared = set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            declared.add(line.split(" ")[2])
+        elif not line.startswith("# HELP "):
+            assert SAMPLE.match(line), line
+            name = line.split("{")[0].split(" ")[0]
+            # Каждому образцу предшествует TYPE его семейства
+            assert name in declared or re.sub(r"_(bucket|sum|count)$", "", name) in declared, line
+    buckets = samples(text, "http_request_duration_seconds_bucket")
+    assert buckets['http_request_duration_seconds_bucket{method="GET",route="/api/recipe/{recipe_id}",le="+Inf"}'] == 1
+
+
+async def test_routes_are_labelled_by_template(client):
+    for recipe_id in (1, 2, 3):
+        await client.get(f"/api/recipe/{recipe_id}")
+    await client.get("/static/styles.css")
+    await client.get("/static/js/app.js")
+    await client.get("/no/such/page")
+    totals = samples((await client.get("/metrics")).text, "http_requests_total")
+
+    assert totals['http_requests_total{method="GET",route="/api/recipe/{recipe_id}",status="200"}'] == 3
+    assert totals['http_requests_total{method="GET",route="/static",status="200"}'] == 2
+    assert totals[f'http_requests_total{{method="GET",route="{UNMATCHED_ROUTE}",status="404"}}'] == 1
+    assert not any("/api/recipe/1" in key or "styles.css" in key for key in totals)
+
+
+async def test_in_flight_is_labelled_by_route(app_and_registry, client):
+    app, registry = app_and_registry
+    request = asyncio.create_task(client.get("/api/slow/7"))
+    await app.state.started.wait()
+    in_flight = samples(registry.render(), "http_requests_in_flight")
+    assert in_flight == {'http_requests_in_flight{method="GET",route="/api/slow/{n}"}': 1}
+
+    app.state.release.set()
+    await request
+    in_flight = samples(registry.render(), "http_requests_in_flight")
+    assert in_flight == {'http_requests_in_flight{method="GET",route="/api/slow/{n}"}': 0}
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import insert
+from app.database.crud import RecipeCrud
+from app.database.models import RecipeSimilar
+
+pytestmark = pytest.mark.anyio
+
+
+def make_recipe(title: str, cooking_time) -> dict:
+    return {"title": title, "description": "", "cuisine": "Italian", "giga_chat_description": "",
+            "cooking_time": cooking_time}
+
+
+@pytest.fixture
+async def client(app_client, db):
+    await RecipeCrud.create_recipes_bulk(db, [make_recipe("Untimed", None), make_recipe("Timed", 25),
+                                              make_recipe("Untimed neighbour", None)])
+    await db.execute(insert(RecipeSimilar), [{"recipe_id": 1, "similar_id": 2, "score": 0.9},
+                                             {"recipe_id": 1, "similar_id": 3, "score": 0.8}])
+    await db.commit()
+    return app_client
+
+
+async def test_list_page_skips_missing_cooking_time(client):
+    response = await client.get("/")
+    assert response.status_code == 200
+    assert "None мин" not in response.text
+    assert "⏱ 25 мин" in response.text
+
+
+async def test_detail_page_skips_missing_cooking_time(client):
+    response = await client.get("/recipe/1")
+    assert response.status_code == 200
+    assert "None мин" not in response.text and "Время приготовления" not in response.text
+    assert "⏱ 25 мин" in response.text  # у похожего рецепта время есть
+
+    response = await client.get("/recipe/2")
+    assert "Время приготовления" in response.text and "25 мин" in response.text
@@ -0,0 +1,53 @@
+from pathlib import Path
+import pytest
+from app.utils.parser_allrecipes import extract_recipe_data, parse_recipe_html
+
+FIXTURES = Path(__file__).parent / "fixtures" / "allrecipes"
+URL = "https://www.allrecipes.com/recipe/1/test/"
+
+
+def load(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def test_plain_recipe():
+    data = parse_recipe_html(load("plain_recipe.html"), URL)
+    assert data["title"] == "Classic Tomato Soup"
+    assert data["description"] == "A quick, creamy tomato soup."
+    assert data["cuisine"] == ["American"]
+    assert data["timem"] == 65
+    assert data["ingredients"] == ["2 tablespoons butter", "1 onion, diced", "1 (28 ounce) can crushed tomatoes"]
+    assert data["steps"] == ["Melt butter and cook the onion until soft.", "Add tomatoes and simmer for 1 hour."]
+    assert data["image_url"] == "https://www.allrecipes.com/thmb/tomato-soup.jpg"
+    assert data["url"] == URL
+
+
+def test_type_list_inside_top_level_list():
+    data = parse_recipe_html(load("type_list.html"), URL)
+    assert data["title"] == "Easy Beef Tacos"
+    assert data["timem"] == 25
+    assert data["ingredients"] == ["1 pound ground beef", "8 taco shells", "1 cup shredded lettuce"]
+    assert data["image_url"] == "https://www.allrecipes.com/thmb/tacos-1.jpg"
+
+
+def test_recipe_nested_in_graph_after_other_blocks():
+    data = parse_recipe_html(load("graph.html"), URL)
+    assert data["title"] == "Lemon Garlic Chicken"
+    assert data["cuisine"] == "Mediterranean"
+    assert data["timem"] == 40
+    assert data["steps"] == ["Sear the chicken, add garlic and lemon, simmer until cooked through."]
+    assert data["image_url"] == "https://www.allrecipes.com/thmb/lemon-chicken.jpg"
+
+
+def test_page_without_json_ld():
+    html = load("no_json_ld.html")
+    assert parse_recipe_html(html, URL) is None
+    assert extract_recipe_data(html) == ([], 'other', 0, [], '')
+
+
+@pytest.mark.parametrize("name", ["plain_recipe.html", "type_list.html", "graph.html"])
+def test_extract_recipe_data_matches_parse_recipe_html(name):
+    html = load(name)
+    data = parse_recipe_html(html, URL)
+    assert extract_recipe_data(html) == (data["ingredients"], data["cuisine"], data["timem"], data["steps"],
+                                         data["image_url"])
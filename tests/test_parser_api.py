@@ -0,0 +1,124 @@
+import asyncio
+import string
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.utils.parser_api import create_session, fetch_catalogue, fetch_json, fetch_random_meals
+
+pytestmark = pytest.mark.anyio
+
+
+def make_meal(meal_id: str, title: str) -> dict:
+    return {"idMeal": meal_id, "strMeal": title}
+
+
+DROP = "drop"  # вместо ответа закрыть соединение
+
+
+class StubMealDB:
+    """
+    Локальная замена TheMealDB: каталог по буквам и заданная последовательность случайных рецептов.
+    Буква x отвечает 500, y рвёт соединение, z отдаёт не JSON
+    """
+
+    def __init__(self, by_letter: dict[str, list[dict]], random_meals: list[dict]):
+        self.by_letter = by_letter
+        self.random_meals = random_meals
+        self.letters = []
+        self.random_calls = 0
+
+    async def search(self, request):
+        letter = request.query["f"]
+        self.letters.append(letter)
+        if letter == "x":
+            return web.Response(status=500)
+        if letter == "y":
+            return await drop_connection(request)
+        if letter == "z":
+            return web.Response(text="<html>rate limited</html>")
+        return web.json_response({"meals": self.by_letter.get(letter)})
+
+    async def random(self, request):
+        meal = self.random_meals[self.random_calls % len(self.random_meals)]
+        self.random_calls += 1
+        if meal == DROP:
+            return await drop_connection(request)
+        return web.json_response({"meals": [meal]})
+
+    async def slow(self, request):
+        await asyncio.sleep(1)
+        return web.json_response({"meals": None})
+
+
+async def drop_connection(request):
+    # Соединение рвётся посреди тела ответа: клиент не может повторить запрос молча
+    response = web.StreamResponse(headers={"Content-Length": "100", "Content-Type": "application/json"})
+    await response.prepare(request)
+    await response.write(b'{"meals": [')
+    request.transport.close()
+    return response
+
+
+@pytest.fixture
+async def stub_api():
+    soup, stew, pie = make_meal("1", "Apple Soup"), make_meal("2", "Beef Stew"), make_meal("3", "Cherry Pie")
+    # Рецепт "1" встречается под двумя буквами, чтобы проверить удаление повторов
+    stub = StubMealDB({"a": [soup], "b": [stew, soup], "c": [pie]}, [soup, soup, stew, soup, pie])
+    app = web.Application()
+    app.router.add_get("/api/search.php", stub.search)
+    app.router.add_get("/api/random.php", stub.random)
+    app.router.add_get("/api/slow.php", stub.slow)
+    server = TestServer(app)
+    await server.start_server()
+    yield stub, str(server.make_url("/api"))
+    await server.close()
+
+
+async def test_catalogue_enumerates_every_letter_once(stub_api):
+    stub, api_url = stub_api
+    async with create_session() as session:
+        await fetch_catalogue(session, api_url=api_url)
+    assert sorted(stub.letters) == list(string.ascii_lowercase)
+
+
+async def test_catalogue_dedupes_on_id_meal(stub_api):
+    stub, api_url = stub_api
+    async with create_session() as session:
+        meals = await fetch_catalogue(session, api_url=api_url)
+    assert sorted(meal["idMeal"] for meal in meals) == ["1", "2", "3"]
+
+
+async def test_random_meals_dedupes_on_id_meal(stub_api):
+    stub, api_url = stub_api
+    async with create_session() as session:
+        meals = await fetch_random_meals(session, 3, concurrency=1, api_url=api_url)
+    assert sorted(meal["idMeal"] for meal in meals) == ["1", "2", "3"]
+    assert stub.random_calls == 5
+
+
+async def test_random_meals_stops_after_max_attempts(stub_api):
+    stub, api_url = stub_api
+    stub.random_meals = [make_meal("1", "Apple Soup")]
+    async with create_session() as session:
+        meals = await fetch_random_meals(session, 2, api_url=api_url, max_attempts=4)
+    assert [meal["idMeal"] for meal in meals] == ["1"]
+    assert stub.random_calls == 4
+
+
+async def test_random_meals_survive_dropped_connection(stub_api):
+    stub, api_url = stub_api
+    stub.random_meals = [DROP, make_meal("1", "Apple Soup"), DROP, make_meal("2", "Beef Stew")]
+    async with create_session() as session:
+        meals = await fetch_random_meals(session, 2, concurrency=1, api_url=api_url)
+    assert sorted(meal["idMeal"] for meal in meals) == ["1", "2"]
+    assert stub.random_calls == 4
+
+
+async def test_fetch_json_returns_none_on_errors(stub_api):
+    stub, api_url = stub_api
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=0.1)) as session:
+        assert await fetch_json(session, "slow.php", api_url) is None
+        assert await fetch_json(session, "search.php", api_url, f="y") is None
+        assert await fetch_json(session, "search.php", api_url, f="z") is None
+        assert await fetch_json(session, "search.php", api_url, f="c") == {"meals": [make_meal("3", "Cherry Pie")]}
@@ -0,0 +1,46 @@
+import pytest
+from app.database.crud import RecipeCrud
+
+pytestmark = pytest.mark.anyio
+
+RECIPES = [
+    {"title": "One perfect review", "cuisine": "Italian"},
+    {"title": "Many great reviews", "cuisine": "Italian"},
+    {"title": "No reviews", "cuisine": "Italian"},
+    {"title": "Solid", "cuisine": "Russian"},
+]
+# recipe_id -> оценки: 5 от одного пользователя, средняя 4.9 по тридцати, 4 по трём
+RATINGS = {1: [5], 2: [5] * 27 + [4] * 3, 4: [4, 4, 4]}
+
+
+@pytest.fixture
+async def rated(db):
+    await RecipeCrud.create_recipes_bulk(db, [dict(recipe, description="", giga_chat_description="",
+                                                   cooking_time=30) for recipe in RECIPES])
+    user_id = 0
+    for recipe_id, ratings in RATINGS.items():
+        for rating in ratings:
+            user_id += 1
+            await RecipeCrud.add_review(db, recipe_id, user_id, rating, "")
+    return db
+
+
+async def popular_titles(db, **kwargs) -> list[str]:
+    return [recipe.title for recipe in await RecipeCrud.get_popular_recipes(db, **kwargs)]
+
+
+async def test_weighted_rating_outranks_single_review(rated):
+    assert await popular_titles(rated) == ["Many great reviews", "One perfect review", "Solid", "No reviews"]
+    assert await popular_titles(rated, limit=2) == ["Many great reviews", "One perfect review"]
+
+
+async def test_per_cuisine_leaderboard(rated):
+    assert await popular_titles(rated, cuisine="Italian") == ["Many great reviews", "One perfect review",
+                                                              "No reviews"]
+    assert await popular_titles(rated, cuisine="Russian") == ["Solid"]
+
+
+async def test_recalculated_ranking_matches_incremental(rated):
+    before = await popular_titles(rated)
+    await RecipeCrud.recalculate_ratings(rated)
+    assert await popular_titles(rated) == before
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import text
+from app.database.crud import RecipeCrud, apply_recipe_sort
+
+pytestmark = pytest.mark.anyio
+
+# Фильтры и сортировка списка рецептов -> индекс, который должен обслуживать запрос
+PLAN_CASES = [
+    ({}, "cooking_time", "ix_recipes_cooking_time"),
+    ({}, "rating", "ix_recipes_average_rating"),
+    ({}, "popularity", "ix_recipes_ratings_count"),
+    ({"cuisines": ["Italian"]}, "id", "ix_recipes_cuisine_id"),
+    ({"cuisines": ["Italian"]}, "cooking_time", "ix_recipes_cuisine_cooking_time"),
+    ({"cuisines": ["Italian"]}, "rating", "ix_recipes_cuisine_average_rating"),
+    ({"cuisines": ["Italian"]}, "popularity", "ix_recipes_cuisine_ratings_count"),
+    ({"cuisines": ["Italian", "Thai"]}, "id", "ix_recipes_cuisine_"),
+    ({"cuisines": ["Italian"], "max_cooking_time": 30}, "cooking_time", "ix_recipes_cuisine_cooking_time"),
+    ({"min_cooking_time": 10, "max_cooking_time": 30}, "cooking_time", "ix_recipes_cooking_time"),
+    ({"min_rating": 4.0}, "rating", "ix_recipes_average_rating"),
+    ({"min_ratings_count": 10}, "popularity", "ix_recipes_ratings_count"),
+]
+
+
+async def explain(db, query) -> list[str]:
+    sql = str(query.compile(db.bind, compile_kwargs={"literal_binds": True}))
+    result = await db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+    return [row.detail for row in result]
+
+
+@pytest.mark.parametrize("filters, sort, index", PLAN_CASES)
+async def test_recipe_list_uses_index(db, filters, sort, index):
+    query = apply_recipe_sort(RecipeCrud.build_recipes_query(**filters), sort).limit(51)
+    plan = await explain(db, query)
+    recipe_steps = [step for step in plan if "recipes" in step]
+    assert recipe_steps, plan
+    assert all("USING" in step for step in recipe_steps), plan
+    assert any(index in step for step in recipe_steps), plan
+
+
+async def test_unfiltered_id_sort_reads_table_in_rowid_order(db):
+    # Таблица SQLite сама упорядочена по id: проход останавливается на LIMIT без сортировки
+    query = apply_recipe_sort(RecipeCrud.build_recipes_query(), "id").limit(51)
+    assert await explain(db, query) == ["SCAN recipes"]
+
+
+@pytest.mark.parametrize("sort", ["id", "cooking_time", "rating", "popularity"])
+async def test_single_cuisine_sort_needs_no_temp_sort(db, sort):
+    # Курсор keyset-пагинации продолжает тот же проход по индексу без отдельной сортировки
+    query = apply_recipe_sort(RecipeCrud.build_recipes_query(cuisines=["Italian"]), sort).limit(51)
+    plan = await explain(db, query)
+    assert not any("TEMP B-TREE" in step for step in plan), plan
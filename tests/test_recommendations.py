@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sqlalchemy.future import select
+from app.database.crud import RecipeCrud
+from app.database.models import RecipeNeighbour, Review, UserRecommendation, Watermark
+from app.recommendations.collaborative import (
+    WATERMARK_NAME, rebuild_recommendations, refresh_recommendations,
+)
+from app.recommendations.matrix import iter_top_k, l2_normalize_rows
+
+pytestmark = pytest.mark.anyio
+
+# Пользователи 1 и 2 любят рецепты 1 и 2 и не любят 3; пользователь 3 оценил 1 и 3, но не 2
+REVIEWS = [(1, 1, 5), (1, 2, 5), (1, 3, 1), (2, 1, 5), (2, 2, 4), (2, 3, 1), (3, 1, 5), (3, 3, 1),
+           (4, 3, 5), (4, 4, 5)]
+
+
+def test_iter_top_k_matches_dense_ranking():
+    rng = np.random.default_rng(7)
+    dense = rng.random((9, 6)).astype(np.float32)
+    dense[dense < 0.5] = 0
+    items = l2_normalize_rows(sparse.csr_matrix(dense))
+    exclude = np.arange(9)
+    # Маленькие блоки проверяют склейку результатов между ними
+    results = list(iter_top_k(items, items, 3, max_block_elements=20, exclude=exclude))
+
+    scores = (items @ items.T).toarray()
+    np.fill_diagonal(scores, -np.inf)
+    assert [row for row, _, _ in results] == list(range(9))
+    for row, columns, top_scores in results:
+        expected = [column for column in np.argsort(-scores[row], kind="stable")[:3] if scores[row, column] > 0]
+        assert sorted(columns.tolist()) == sorted(expected)
+        assert np.allclose(top_scores, scores[row, columns])
+        assert list(top_scores) == sorted(top_scores, reverse=True)
+        assert row not in columns
+
+
+def test_iter_top_k_excludes_rated_items():
+    queries = sparse.csr_matrix(np.array([[1.0, 1.0, 1.0]], dtype=np.float32))
+    items = sparse.csr_matrix(np.eye(3, dtype=np.float32))
+    rated = sparse.csr_matrix(np.array([[1.0, 0.0, 1.0]], dtype=np.float32))
+    [(row, columns, scores)] = iter_top_k(queries, items, 3, 100, exclude_matrix=rated)
+    assert columns.tolist() == [1] and scores.tolist() == [1.0]
+
+
+async def seed(db, reviews):
+    await RecipeCrud.create_recipes_bulk(db, [
+        {"title": f"Recipe {number}", "description": "", "cuisine": "Italian", "giga_chat_description": "",
+         "cooking_time": 30} for number in range(1, 5)
+    ])
+    await add_reviews(db, reviews)
+
+
+async def add_reviews(db, reviews):
+    db.add_all(Review(user_id=user_id, recipe_id=recipe_id, rating=rating) for user_id, recipe_id, rating in reviews)
+    await db.commit()
+
+
+async def get_lists(db, model, owner, item) -> dict[int, list[int]]:
+    result = await db.execute(select(getattr(model, owner), getattr(model, item))
+                              .order_by(getattr(model, owner), model.score.desc(), getattr(model, item)))
+    lists = {}
+    for owner_id, item_id in result:
+        lists.setdefault(owner_id, []).append(item_id)
+    return lists
+
+
+async def test_rebuild_recommends_unrated_recipes_liked_by_similar_users(db):
+    await seed(db, REVIEWS)
+    assert await rebuild_recommendations(db) == 4
+
+    neighbours = await get_lists(db, RecipeNeighbour, "recipe_id", "neighbour_id")
+    assert neighbours[1][0] == 2 and neighbours[2][0] == 1
+    assert 3 not in neighbours[1]  # отрицательное сходство не хранится
+
+    recommendations = await get_lists(db, UserRecommendation, "user_id", "recipe_id")
+    assert recommendations[3][0] == 2
+    rated = {}
+    for user_id, recipe_id, _ in REVIEWS:
+        rated.setdefault(user_id, set()).add(recipe_id)
+    assert all(not rated[user_id] & set(items) for user_id, items in recommendations.items())
+    assert [recipe.id for recipe in await RecipeCrud.get_recommended_recipes(db, 3)][0] == 2
+    assert await db.scalar(select(Watermark.last_id).where(Watermark.name == WATERMARK_NAME)) == len(REVIEWS)
+
+
+async def test_refresh_without_watermark_rebuilds(db):
+    await seed(db, REVIEWS)
+    assert await refresh_recommendations(db) == 4
+    assert await db.scalar(select(Watermark.last_id).where(Watermark.name == WATERMARK_NAME)) == len(REVIEWS)
+
+
+async def test_incremental_refresh_processes_only_new_reviews(db):
+    await seed(db, REVIEWS)
+    await rebuild_recommendations(db)
+    assert await refresh_recommendations(db) == 0
+
+    # Новый пользователь похож на 1 и 2; новые оценки только у рецептов 1 и 3
+    new_reviews = [(5, 1, 5), (5, 3, 1)]
+    await add_reviews(db, new_reviews)
+    assert await refresh_recommendations(db) == 1
+    assert await db.scalar(select(Watermark.last_id).where(Watermark.name == WATERMARK_NAME)) == len(REVIEWS) + 2
+
+    recommendations = await get_lists(db, UserRecommendation, "user_id", "recipe_id")
+    assert recommendations[5][0] == 2 and not {1, 3} & set(recommendations[5])
+    refreshed = await get_lists(db, RecipeNeighbour, "recipe_id", "neighbour_id")
+
+    # Списки соседей рецептов с новыми отзывами совпадают с полной пересборкой
+    await rebuild_recommendations(db)
+    rebuilt = await get_lists(db, RecipeNeighbour, "recipe_id", "neighbour_id")
+    for recipe_id in (1, 3):
+        assert refreshed.get(recipe_id) == rebuilt.get(recipe_id)
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from app.database.crud import RecipeCrud, bayesian_rating
+from app.database.database import Base
+from app.database.models import Recipe, User
+
+pytestmark = pytest.mark.anyio
+
+RATINGS = [5, 4, 3, 5, 1, 2, 5, 4, 4, 3, 5, 5, 2, 4, 1, 3, 5, 4, 4, 5]
+SOUP = {"title": "Soup", "description": "", "cuisine": "Russian", "giga_chat_description": "", "cooking_time": 30}
+
+
+@pytest.fixture
+async def file_engine(tmp_path):
+    # Отдельные соединения к файлу: у каждой сессии своя транзакция, как у параллельных запросов
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'reviews.db'}", connect_args={"timeout": 30})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def seed(db, users: int):
+    await RecipeCrud.create_recipes_bulk(db, [SOUP, dict(SOUP, title="Stew")])
+    db.add_all(User(username=f"user{number}", hashed_password=b"x") for number in range(users))
+    await db.commit()
+
+
+async def get_aggregates(db, recipe_id: int):
+    result = await db.execute(
+        select(Recipe.ratings_sum, Recipe.ratings_count, Recipe.average_rating, Recipe.weighted_rating,
+               Recipe.version).where(Recipe.id == recipe_id)
+    )
+    return result.one()
+
+
+async def test_concurrent_reviews_produce_exact_aggregates(file_engine):
+    session_factory = sessionmaker(bind=file_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        await seed(db, len(RATINGS))
+
+    async def review(user_id, rating):
+        async with session_factory() as db:
+            return await RecipeCrud.add_review(db, 1, user_id, rating, "")
+
+    reviews = await asyncio.gather(*(review(user_id, rating) for user_id, rating in enumerate(RATINGS, start=1)))
+    assert all(reviews)
+
+    async with session_factory() as db:
+        ratings_sum, ratings_count, average_rating, weighted_rating, version = await get_aggregates(db, 1)
+        assert (ratings_sum, ratings_count) == (sum(RATINGS), len(RATINGS))
+        assert average_rating == pytest.approx(sum(RATINGS) / len(RATINGS))
+        assert weighted_rating == pytest.approx(bayesian_rating(sum(RATINGS), len(RATINGS)))
+        assert version == 1 + len(RATINGS)
+        assert await RecipeCrud.get_catalog_version(db) == 1 + len(RATINGS)
+        # Второй рецепт не затронут
+        assert (await get_aggregates(db, 2))[:2] == (0, 0)
+
+
+async def test_review_for_missing_recipe_is_rolled_back(db):
+    await seed(db, 1)
+    assert await RecipeCrud.add_review(db, 99, 1, 5, "") is None
+    reviews, _ = await RecipeCrud.get_reviews_for_recipe(db, 99)
+    assert reviews == []
+
+
+async def test_recalculate_ratings_repairs_drifted_rows(db):
+    await seed(db, 3)
+    for user_id, rating in ((1, 5), (2, 4), (3, 2)):
+        await RecipeCrud.add_review(db, 1, user_id, rating, "")
+    # Агрегаты разошлись с отзывами: потерянное обновление у одного рецепта, мусор у другого
+    await db.execute(update(Recipe).where(Recipe.id == 1).values(ratings_sum=9, ratings_count=2, average_rating=4.5))
+    await db.execute(update(Recipe).where(Recipe.id == 2).values(ratings_sum=7, ratings_count=3, average_rating=2.3,
+                                                                  weighted_rating=9.0))
+    await db.commit()
+
+    assert await RecipeCrud.recalculate_ratings(db) == 2
+    ratings_sum, ratings_count, average_rating, weighted_rating, _ = await get_aggregates(db, 1)
+    assert (ratings_sum, ratings_count) == (11, 3)
+    assert average_rating == pytest.approx(11 / 3)
+    assert weighted_rating == pytest.approx(bayesian_rating(11, 3))
+    assert (await get_aggregates(db, 2))[:4] == (0, 0, 0.0, 0.0)
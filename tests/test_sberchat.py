@@ -0,0 +1,108 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from app.utils import sberchat
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeGigaChat:
+    """Замена клиента GigaChat: считает вызовы и одновременные запросы, отвечает с задержкой"""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @staticmethod
+    def response(prompt: str):
+        message = SimpleNamespace(content=f"**Description** of {prompt[-12:]}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def chat(self, prompt: str):
+        self.prompts.append(prompt)
+        return self.response(prompt)
+
+    async def achat(self, prompt: str):
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return self.response(prompt)
+
+
+class ClientFactory:
+    def __init__(self):
+        self.clients = []
+
+    def __call__(self):
+        client = FakeGigaChat()
+        self.clients.append(client)
+        return client
+
+    @property
+    def prompts(self):
+        return [prompt for client in self.clients for prompt in client.prompts]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(sberchat, "description_cache", sberchat.DescriptionCache(tmp_path / "cache.sqlite3"))
+
+
+def recipe(n: int) -> str:
+    return json.dumps({"id": str(n), "title": f"Recipe {n}"})
+
+
+async def test_cache_hit_never_creates_client():
+    recipes = [recipe(1), recipe(2)]
+    first = ClientFactory()
+    descriptions = await sberchat.describe_many(recipes, client_factory=first)
+    assert len(first.prompts) == 2
+
+    second = ClientFactory()
+    assert await sberchat.describe_many(recipes, client_factory=second) == descriptions
+    assert second.clients == []
+    assert sberchat.ask(sberchat.promt2, recipes[0], client_factory=second) == descriptions[0]
+    assert second.clients == []
+
+
+async def test_cache_key_ignores_json_formatting():
+    factory = ClientFactory()
+    await sberchat.describe_many([json.dumps({"id": "1", "title": "Soup"})], client_factory=factory)
+    await sberchat.describe_many([json.dumps({"title": "Soup", "id": "1"}, indent=2)], client_factory=factory)
+    assert len(factory.prompts) == 1
+
+
+async def test_duplicate_recipe_in_batch_is_described_once():
+    factory = ClientFactory()
+    descriptions = await sberchat.describe_many([recipe(1), recipe(2), recipe(1)], client_factory=factory)
+    assert len(factory.prompts) == 2
+    assert descriptions[0] == descriptions[2] != descriptions[1]
+    assert "*" not in descriptions[0]
+
+
+async def test_in_flight_requests_are_limited():
+    factory = ClientFactory()
+    descriptions = await sberchat.describe_many([recipe(n) for n in range(10)], concurrency=3,
+                                                client_factory=factory)
+    assert len(descriptions) == 10
+    assert len(factory.prompts) == 10
+    assert factory.clients[0].max_in_flight == 3
@@ -0,0 +1,66 @@
+from typing import List
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import update
+from app.database.crud import RecipeCrud, recipe_rows_to_dicts
+from app.database.models import Recipe
+from app.schemas import RecipePage, RecipeSummary
+
+pytestmark = pytest.mark.anyio
+
+RECIPES = [
+    {"title": "Борщ", "description": "Свёкла.", "cuisine": "Russian", "giga_chat_description": "Суп",
+     "cooking_time": 90, "image_url": "https://example.com/borscht.jpg", "ingredients": ["beet"]},
+    {"title": "Crème brûlée \"classic\"", "description": "", "cuisine": "French", "giga_chat_description": None,
+     "cooking_time": None, "ingredients": []},
+    {"title": "Tacos", "description": "", "cuisine": None, "giga_chat_description": "", "cooking_time": 25,
+     "image_url": "", "ingredients": ["tortilla"]},
+]
+
+
+def make_app(rows) -> FastAPI:
+    # Старый путь (response_model + JSONResponse) и быстрый путь приложения на одних и тех же строках
+    app = FastAPI()
+
+    @app.get("/model/list", response_model=List[RecipeSummary])
+    async def model_list():
+        return rows
+
+    @app.get("/orjson/list", response_model=List[RecipeSummary])
+    async def orjson_list():
+        return ORJSONResponse(recipe_rows_to_dicts(rows))
+
+    @app.get("/model/page", response_model=RecipePage)
+    async def model_page():
+        return {"items": rows, "next_cursor": "abc"}
+
+    @app.get("/orjson/page", response_model=RecipePage)
+    async def orjson_page():
+        return ORJSONResponse({"items": recipe_rows_to_dicts(rows), "next_cursor": "abc"})
+
+    return app
+
+
+@pytest.fixture
+async def rows(db):
+    await RecipeCrud.create_recipes_bulk(db, RECIPES)
+    # Рейтинги с длинной дробной частью и целые значения float
+    await db.execute(update(Recipe).where(Recipe.id == 1).values(average_rating=10 / 3, ratings_count=3))
+    await db.execute(update(Recipe).where(Recipe.id == 2).values(average_rating=5.0, ratings_count=1))
+    await db.commit()
+    recipes, _ = await RecipeCrud.get_recipes_by_filters(db, limit=10)
+    return recipes
+
+
+@pytest.mark.parametrize("kind", ["list", "page"])
+async def test_orjson_matches_response_model(rows, kind):
+    assert len(rows) == len(RECIPES)
+    transport = httpx.ASGITransport(app=make_app(rows))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        expected = await client.get(f"/model/{kind}")
+        actual = await client.get(f"/orjson/{kind}")
+    assert expected.status_code == actual.status_code == 200
+    assert actual.content == expected.content
+    assert actual.headers["content-type"] == expected.headers["content-type"]
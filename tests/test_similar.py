@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.future import select
+from app.core.config import settings
+from app.database.crud import RecipeCrud
+from app.database.models import Recipe, RecipeIngredient, RecipeSimilar
+from app.recommendations.similar import update_similar
+
+pytestmark = pytest.mark.anyio
+
+
+def make_recipes(prefix: str, count: int) -> list[dict]:
+    # Общие ингредиенты связывают все рецепты, поэтому у каждого есть соседи
+    return [{"title": f"{prefix} {number}", "description": "", "cuisine": "Italian", "giga_chat_description": "",
+             "cooking_time": 30, "ingredients": ["tomato", "garlic", f"{prefix} {number}"]}
+            for number in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def index_path(tmp_path, monkeypatch):
+    path = tmp_path / "similar_index.npz"
+    monkeypatch.setattr(settings.similar_recipes, "index_path", path)
+    return path
+
+
+async def import_recipes(db, recipes) -> list[int]:
+    result = await RecipeCrud.create_recipes_bulk(db, recipes)
+    await update_similar(db, result["inserted"])
+    return result["inserted"]
+
+
+async def similar_pairs(db) -> set[tuple[int, int]]:
+    return set((await db.execute(select(RecipeSimilar.recipe_id, RecipeSimilar.similar_id))).all())
+
+
+async def existing_ids(db) -> set[int]:
+    return set((await db.execute(select(Recipe.id))).scalars())
+
+
+async def test_clear_then_reimport_rebuilds_index(db, index_path):
+    await import_recipes(db, make_recipes("old", 6))
+    assert index_path.exists()
+
+    await RecipeCrud.clear_recipes_table(db)
+    assert not index_path.exists()
+
+    ids = await import_recipes(db, make_recipes("new", 3))
+    pairs = await similar_pairs(db)
+    assert {similar_id for _, similar_id in pairs} <= set(ids) == await existing_ids(db)
+    assert {recipe_id for recipe_id, _ in pairs} == set(ids)
+
+
+async def test_stale_index_falls_back_to_rebuild(db, index_path):
+    await import_recipes(db, make_recipes("old", 6))
+    # Рецепты удалены в обход clear_recipes_table, файл индекса остался
+    for model in (RecipeSimilar, RecipeIngredient, Recipe):
+        await db.execute(delete(model))
+    await db.commit()
+    assert index_path.exists()
+
+    ids = await import_recipes(db, make_recipes("new", 3))
+    pairs = await similar_pairs(db)
+    assert pairs and {similar_id for _, similar_id in pairs} <= set(ids)
+
+
+async def test_incremental_update_keeps_index_in_sync(db):
+    first = await import_recipes(db, make_recipes("first", 4))
+    second = await import_recipes(db, make_recipes("second", 2))
+    pairs = await similar_pairs(db)
+    assert {similar_id for _, similar_id in pairs} <= set(first + second)
+    assert {recipe_id for recipe_id, _ in pairs} == set(first + second)
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker, undefer
+from sqlalchemy.pool import StaticPool
+from app.database.crud import RecipeCrud
+from app.database.models import Recipe
+from app.database.upgrade import upgrade_database, upgrade_schema
+from app.schemas import RecipeBase
+from app.utils import repair_ratings
+from app.utils.reindex_ingredients import extract_ingredients
+
+pytestmark = pytest.mark.anyio
+
+# Схема из первой версии приложения, до всех колонок и индексов, добавленных позже
+BASELINE_DDL = [
+    "CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, username VARCHAR NOT NULL UNIQUE, "
+    "hashed_password BLOB NOT NULL)",
+    "CREATE TABLE recipes (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR NOT NULL, description VARCHAR, "
+    "cuisine VARCHAR, average_rating FLOAT, ratings_count INTEGER, giga_chat_description VARCHAR, "
+    "cooking_time INTEGER, image_url VARCHAR)",
+    "CREATE TABLE reviews (id INTEGER NOT NULL PRIMARY KEY, recipe_id INTEGER REFERENCES recipes (id), "
+    "user_id INTEGER REFERENCES users (id), rating INTEGER NOT NULL, text VARCHAR)",
+    "INSERT INTO recipes (title, description, cuisine, average_rating, ratings_count, cooking_time) VALUES "
+    "('Soup', 'Ingredients:\n2 carrots\n1 onion\n\nInstructions:\n1. Boil.', 'Russian', 4.0, 1, 30)",
+    "INSERT INTO users (username, hashed_password) VALUES ('bob', x'00')",
+    "INSERT INTO reviews (recipe_id, user_id, rating, text) VALUES (1, 1, 4, 'ok')",
+]
+
+
+@pytest.fixture
+async def baseline_engine():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        for statement in BASELINE_DDL:
+            await conn.execute(text(statement))
+    yield engine
+    await engine.dispose()
+
+
+def get_schema(connection):
+    inspector = inspect(connection)
+    return {table: ({column["name"] for column in inspector.get_columns(table)},
+                    {index["name"] for index in inspector.get_indexes(table)})
+            for table in inspector.get_table_names()}
+
+
+async def test_upgrade_adds_columns_tables_and_indexes(baseline_engine):
+    async with baseline_engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+        schema = await conn.run_sync(get_schema)
+
+    columns, indexes = schema["recipes"]
+    assert {column.name for column in Recipe.__table__.columns} <= columns
+    assert {index.name for index in Recipe.__table__.indexes} <= indexes
+    assert {"ingredients", "recipe_ingredients"} <= set(schema)
+
+
+async def test_upgrade_is_idempotent(baseline_engine):
+    async with baseline_engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+        first = await conn.run_sync(get_schema)
+        await conn.run_sync(upgrade_schema)
+        assert await conn.run_sync(get_schema) == first
+
+
+async def test_reindex_ingredients_runs_on_upgraded_database(baseline_engine):
+    async with baseline_engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+
+    session_factory = sessionmaker(bind=baseline_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        # Тот же запрос, что в reindex_ingredients.main
+        result = await db.execute(
+            select(Recipe).where(Recipe.ingredients_count == 0).options(undefer(Recipe.description))
+        )
+        recipe = result.scalars().one()
+        await RecipeCrud.set_recipe_ingredients(db, recipe, extract_ingredients(recipe.description))
+        await db.commit()
+        assert (await db.execute(select(Recipe.ingredients_count))).scalar() == 2
+
+
+async def test_upgraded_database_supports_source_upsert(baseline_engine):
+    async with baseline_engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+        _, indexes = (await conn.run_sync(get_schema))["recipes"]
+    assert "uq_recipes_source" in indexes
+
+    meal = {"title": "Borscht", "description": "Beets.", "cuisine": "Russian", "giga_chat_description": "",
+            "cooking_time": 90, "ingredients": ["beet"], "source": "themealdb", "source_id": 52771}
+    session_factory = sessionmaker(bind=baseline_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        first = await RecipeCrud.create_recipes_bulk(db, [meal])
+        second = await RecipeCrud.create_recipes_bulk(db, [meal])
+        changed = await RecipeCrud.create_recipes_bulk(db, [dict(meal, cooking_time=100)])
+
+    assert len(first["inserted"]) == 1 and not first["failed"]
+    assert second == {"inserted": [], "unchanged": 1, "failed": []}
+    assert changed["inserted"] == first["inserted"]
+
+
+async def test_repair_ratings_runs_on_baseline_database(baseline_engine, monkeypatch):
+    session_factory = sessionmaker(bind=baseline_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(repair_ratings, "upgrade_database", lambda: upgrade_database(baseline_engine))
+    monkeypatch.setattr(repair_ratings, "async_session", session_factory)
+    await repair_ratings.main()
+
+    async with session_factory() as db:
+        # То же, что читает GET /api/recipe/1
+        assert await RecipeCrud.get_recipe_version(db, 1) == 2
+        recipe = RecipeBase.model_validate(await RecipeCrud.get_recipe(db, 1))
+        assert (recipe.average_rating, recipe.ratings_count) == (4.0, 1)
+        assert await RecipeCrud.get_catalog_version(db) == 1
+
+
+async def test_upgrade_seeds_catalog_version(baseline_engine):
+    await upgrade_database(baseline_engine)
+    await upgrade_database(baseline_engine)
+    async with baseline_engine.connect() as conn:
+        rows = (await conn.execute(text("SELECT name, version FROM catalog_versions"))).all()
+    assert rows == [("recipes", 0)]